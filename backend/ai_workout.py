@@ -0,0 +1,203 @@
+"""Parsing, validation and local repair of LLM-generated workout plans.
+
+Responses are validated against `GeneratedWorkout`. When that fails,
+`repair_json` fixes the defects models commonly produce (markdown fences,
+prose around the object, trailing commas, output truncated mid-array) so
+a malformed reply costs a few microseconds instead of a new generation.
+Only if repair also fails does the caller spend a short "fix this JSON"
+call, built with `fix_prompt`.
+"""
+import json
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+
+class WorkoutParseError(Exception):
+    pass
+
+
+INTEGER = re.compile(r"\d+")
+
+
+def _leading_int(value, hours_to_minutes: bool = False):
+    # "3-4" -> 3, "45 minutes" -> 45, "1 hour" -> 60; anything else is left to validation
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        match = INTEGER.search(value)
+        if match:
+            number = int(match.group())
+            if hours_to_minutes and ("hour" in value.lower() or "hr" in value.lower()) and number <= 4:
+                number *= 60
+            return number
+    return value
+
+
+class GeneratedExercise(BaseModel):
+    name: str = Field(min_length=1)
+    sets: int = Field(default=3, ge=1, le=20)
+    reps: str = "10"
+    rest: str = "60s"
+    category: Optional[str] = None
+    description: Optional[str] = None
+
+    @field_validator("sets", mode="before")
+    @classmethod
+    def _sets(cls, value):
+        return 3 if value is None else _leading_int(value)
+
+    @field_validator("reps", "rest", mode="before")
+    @classmethod
+    def _text(cls, value, info):
+        # "reps": 12 and "rest": 60 are common and unambiguous; null means "use the default"
+        if value is None:
+            return cls.model_fields[info.field_name].default
+        return str(value) if isinstance(value, (int, float)) else value
+
+
+class GeneratedWorkout(BaseModel):
+    name: str = "AI Generated Workout"
+    description: str = "Custom workout plan"
+    duration: int = Field(default=45, ge=5, le=240)
+    exercises: List[GeneratedExercise] = Field(min_length=1)
+
+    @field_validator("name", "description", "duration", mode="before")
+    @classmethod
+    def _defaults(cls, value, info):
+        if value is None:
+            return cls.model_fields[info.field_name].default
+        return _leading_int(value, hours_to_minutes=True) if info.field_name == "duration" else value
+
+
+def strip_fences(text: str) -> str:
+    # Models often wrap JSON in ```json ... ``` despite being asked not to
+    clean = text.strip()
+    if clean.startswith("```"):
+        clean = clean.split("```")[1]
+        if clean.startswith("json"):
+            clean = clean[4:]
+        clean = clean.strip()
+    return clean
+
+
+def _outside_strings(text: str):
+    """Yield (index, char) for characters outside string literals, quotes included."""
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                yield i, char
+            continue
+        if char == '"':
+            in_string = True
+        yield i, char
+
+
+def _strip_trailing_commas(text: str) -> str:
+    drop = set()
+    pending = None
+    for i, char in _outside_strings(text):
+        if char == ",":
+            pending = i
+        elif char in "}]" and pending is not None:
+            drop.add(pending)
+            pending = None
+        elif not char.isspace():
+            pending = None
+    return "".join(char for i, char in enumerate(text) if i not in drop)
+
+
+def _balance(text: str):
+    """Cut after the first complete top-level value, or close a truncated one.
+
+    Returns (text, fix) where fix is "prose", "truncated" or None. A
+    truncated value is cut back to the latest point (end of text, a comma
+    or a closed container) where closing the open brackets gives valid
+    JSON, dropping the member that was cut off rather than an empty stub.
+    """
+    stack = []
+    cuts = []
+    last = -1
+    for i, char in _outside_strings(text):
+        last = i
+        if char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+            if not stack:
+                return text[:i + 1], "prose" if text[i + 1:].strip() else None
+            cuts.append((i + 1, list(stack)))
+        elif char == "," and stack:
+            cuts.append((i, list(stack)))
+    if not stack:
+        return text, None
+    if last == len(text.rstrip()) - 1:
+        # Not cut off inside a string: the text itself may end on a complete value
+        cuts.append((len(text), list(stack)))
+    for position, open_brackets in reversed(cuts[-64:]):
+        candidate = text[:position].rstrip().rstrip(",") + "".join(reversed(open_brackets))
+        try:
+            json.loads(candidate)
+        except ValueError:
+            continue
+        return candidate, "truncated"
+    return text, None
+
+
+def repair_json(text: str):
+    """Returns (repaired text, list of fixes applied)."""
+    fixes = []
+    clean = strip_fences(text)
+    if clean != text.strip():
+        fixes.append("fences")
+
+    start = clean.find("{")
+    if start == -1:
+        return clean, fixes
+    if start > 0:
+        fixes.append("prose")
+    clean = clean[start:]
+
+    without_commas = _strip_trailing_commas(clean)
+    if without_commas != clean:
+        fixes.append("trailing_comma")
+    clean, fix = _balance(without_commas)
+    if fix and fix not in fixes:
+        fixes.append(fix)
+    return clean, fixes
+
+
+def _validate(text: str) -> GeneratedWorkout:
+    return GeneratedWorkout.model_validate(json.loads(text))
+
+
+def parse_workout(text: str):
+    """Returns (workout, fixes); fixes is empty when the reply was valid as-is.
+
+    Raises WorkoutParseError when neither the reply nor its repair validates.
+    """
+    try:
+        return _validate(strip_fences(text)), []
+    except (ValueError, ValidationError):
+        pass
+    repaired, fixes = repair_json(text)
+    try:
+        return _validate(repaired), fixes
+    except (ValueError, ValidationError) as e:
+        raise WorkoutParseError(str(e)) from e
+
+
+def fix_prompt(text: str, error: Exception, limit: int = 4000) -> str:
+    return (
+        "The following workout plan JSON is invalid. Return ONLY the corrected JSON object "
+        'with keys "name", "description", "duration" and "exercises" '
+        '(each exercise has "name", "sets", "reps", "rest"), no markdown or extra text.\n\n'
+        f"Error: {str(error)[:300]}\n\nJSON:\n{text[:limit]}"
+    )
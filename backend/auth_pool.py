@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AuthPoolSaturated(Exception):
+    pass
+
+
+class AuthWorkerPool:
+    """Bounded thread pool for bcrypt hashing/verification.
+
+    bcrypt releases the GIL while it works, so a thread pool keeps the event
+    loop free without paying process start-up or pickling costs. Work beyond
+    `size + queue_depth` outstanding jobs is rejected instead of queued.
+    """
+
+    def __init__(self, pwd_context, size: int = 4, queue_depth: int = 32, observer=None):
+        self.pwd_context = pwd_context
+        self.observer = observer
+        self.size = size
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="auth")
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "queueWaitTotalMs": 0.0,
+            "queueWaitMaxMs": 0.0,
+            "hashTimeTotalMs": 0.0,
+            "hashTimeMaxMs": 0.0,
+        }
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self.pwd_context.verify, password, hashed)
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._outstanding >= self.size + self.queue_depth:
+                self._stats["rejected"] += 1
+                raise AuthPoolSaturated()
+            self._outstanding += 1
+            self._stats["submitted"] += 1
+
+        enqueued_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished_at = time.perf_counter()
+                self._record((started_at - enqueued_at) * 1000, (finished_at - started_at) * 1000)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, run)
+        finally:
+            # A caller cancelled while its job is queued cancels the future,
+            # so run() never executes; the slot must not depend on it
+            with self._lock:
+                self._outstanding -= 1
+
+    def _record(self, wait_ms: float, hash_ms: float):
+        with self._lock:
+            stats = self._stats
+            stats["completed"] += 1
+            stats["queueWaitTotalMs"] += wait_ms
+            stats["queueWaitMaxMs"] = max(stats["queueWaitMaxMs"], wait_ms)
+            stats["hashTimeTotalMs"] += hash_ms
+            stats["hashTimeMaxMs"] = max(stats["hashTimeMaxMs"], hash_ms)
+        if self.observer is not None:
+            self.observer(wait_ms / 1000, hash_ms / 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            outstanding = self._outstanding
+        completed = stats["completed"] or 1
+        return {
+            "poolSize": self.size,
+            "queueDepth": self.queue_depth,
+            "outstanding": outstanding,
+            "submitted": stats["submitted"],
+            "rejected": stats["rejected"],
+            "completed": stats["completed"],
+            "queueWaitAvgMs": round(stats["queueWaitTotalMs"] / completed, 2),
+            "queueWaitMaxMs": round(stats["queueWaitMaxMs"], 2),
+            "hashTimeAvgMs": round(stats["hashTimeTotalMs"] / completed, 2),
+            "hashTimeMaxMs": round(stats["hashTimeMaxMs"], 2),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def create_auth_pool(pwd_context, observer=None) -> AuthWorkerPool:
+    return AuthWorkerPool(
+        pwd_context,
+        size=int(os.environ.get("AUTH_POOL_SIZE", "4")),
+        queue_depth=int(os.environ.get("AUTH_QUEUE_DEPTH", "32")),
+        observer=observer,
+    )
@@ -0,0 +1,149 @@
+"""Per-request LLM client construction vs the pooled client registry.
+
+Both modes call a local OpenAI-compatible stand-in server. "per-request"
+builds a fresh client (and connection) for every call, the way a new
+LlmChat per request does. "pooled" reuses one `LLMClientRegistry` client
+across calls. Pass a certificate to include TLS handshakes, which is where
+most of the per-request cost comes from in production. Run from the
+backend directory:
+
+    python benchmarks/bench_llm_clients.py [--calls 200] [--concurrency 8] [--latency 0.02]
+    python benchmarks/bench_llm_clients.py --tls-cert cert.pem --tls-key key.pem
+"""
+import argparse
+import asyncio
+import json
+import math
+import ssl
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llm_clients import LLMClientRegistry, TextMessage  # noqa: E402
+
+COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench-model",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+}
+
+
+class StandInServer:
+    """Minimal HTTP/1.1 keep-alive server answering every POST with a completion."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = dict(
+                    line.split(": ", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ": " in line
+                )
+                lowered = {key.lower(): value for key, value in headers.items()}
+                await reader.readexactly(int(lowered.get("content-length", "0")))
+                await asyncio.sleep(self.latency)
+                body = json.dumps(COMPLETION).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if lowered.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def percentile(sorted_values, pct: float) -> float:
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+async def timed_calls(call, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return sorted(latencies), time.perf_counter() - started
+
+
+async def run(args):
+    server = StandInServer(args.latency)
+    ssl_context = None
+    if args.tls_cert:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(args.tls_cert, args.tls_key)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0, ssl=ssl_context)
+    port = listener.sockets[0].getsockname()[1]
+    base_url = f"{'https' if ssl_context else 'http'}://127.0.0.1:{port}/v1"
+    # The stand-in's certificate is self-signed
+    verify = ssl_context is None
+
+    message = TextMessage("Suggest a warmup")
+    results = {}
+
+    async def per_request():
+        clients = LLMClientRegistry(api_key="bench", base_url=base_url, verify=verify)
+        try:
+            await clients.chat("openai", "bench-model", "bench", "You are a coach").send_message(message)
+        finally:
+            await clients.aclose()
+
+    shared = LLMClientRegistry(api_key="bench", base_url=base_url, verify=verify)
+
+    async def pooled():
+        await shared.chat("openai", "bench-model", "bench", "You are a coach").send_message(message)
+
+    try:
+        for name, call in (("per-request", per_request), ("pooled", pooled)):
+            await call()  # exclude one-time imports and the first handshake
+            server.connections = 0
+            latencies, elapsed = await timed_calls(call, args.calls, args.concurrency)
+            results[name] = {
+                "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95Ms": round(percentile(latencies, 95) * 1000, 2),
+                "throughputRps": round(args.calls / elapsed, 1),
+                "connections": server.connections,
+            }
+    finally:
+        await shared.aclose()
+        listener.close()
+        await listener.wait_closed()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in server think time (s)")
+    parser.add_argument("--tls-cert")
+    parser.add_argument("--tls-key")
+    args = parser.parse_args()
+    if bool(args.tls_cert) != bool(args.tls_key):
+        parser.error("--tls-cert and --tls-key go together")
+
+    results = asyncio.run(run(args))
+    print(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>8} {'connections':>12}")
+    for name, row in results.items():
+        print(f"{name:<12} {row['p50Ms']:>8} {row['p95Ms']:>8} {row['throughputRps']:>8} {row['connections']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""In-process load test for the API at a target request rate.
+
+`server.app` is driven through httpx's ASGI transport against a local
+mongod (`--mongo-url`, a throwaway database that is dropped afterwards) or
+mongomock-motor (`--mongomock`). LLM chats come from `FakeLlmChat`,
+which answers deterministically after `--llm-latency` seconds, so runs
+measure our code rather than the provider.
+
+Arrivals are open-loop: requests start on schedule whether or not earlier
+ones have finished, and latency is measured from the scheduled start so a
+stalled server is not hidden by a stalled client. Run from the backend
+directory:
+
+    python benchmarks/load.py --mongomock --rps 50 --duration 30 --out baseline.json
+    python benchmarks/load.py --mongomock --rps 50 --duration 30 --compare baseline.json
+
+The harness shares the event loop with the app, so absolute numbers are a
+floor; compare runs made the same way on the same machine. The exit
+status is non-zero when any request failed.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+DEFAULT_MIX = "signup_login=1,log_meal=4,dashboard=6,ai_chat=2,ai_workout=1"
+
+
+class FakeLlmChat:
+    """Stand-in for emergentintegrations' LlmChat with fixed latency."""
+
+    latency = 0.2
+    jitter = 0.0
+    rng = random.Random(0)
+
+    def __init__(self, api_key=None, session_id=None, system_message=""):
+        self.session_id = session_id
+        self.system_message = system_message or ""
+
+    def with_model(self, provider, model):
+        return self
+
+    async def _wait(self, fraction: float = 1.0):
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)) * fraction)
+
+    def _reply(self, text: str) -> str:
+        if "workout" in self.system_message.lower() and "JSON" in text:
+            return json.dumps({
+                "name": "Load Test Plan",
+                "description": "Deterministic plan from the load harness",
+                "duration": 45,
+                "exercises": [
+                    {"name": f"Exercise {i}", "category": "strength", "sets": 3, "reps": "8-12", "rest": "60s"}
+                    for i in range(6)
+                ],
+            })
+        return f"Keep it up! You said: {text[:80]}"
+
+    async def send_message(self, user_message) -> str:
+        await self._wait()
+        return self._reply(user_message.text)
+
+    async def stream_message(self, user_message):
+        words = self._reply(user_message.text).split(" ")
+        for word in words:
+            await self._wait(1 / len(words))
+            yield word + " "
+
+
+class FakeUserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, label: str, seconds: float, ok: bool):
+        self.samples.setdefault(label, []).append(seconds)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+
+
+def percentile(sorted_values, pct: float) -> float:
+    # Nearest-rank
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+class Scenarios:
+    """One method per scenario; each records its own requests."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, users, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.users = users
+        self.rng = rng
+
+    async def request(self, label: str, method: str, url: str, scheduled: float, **kwargs):
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.recorder.record(label, time.perf_counter() - scheduled, ok)
+        return response
+
+    async def signup_login(self, scheduled: float):
+        email = f"load.{uuid.uuid4().hex}@example.com"
+        credentials = {"email": email, "password": "load-test-password"}
+        await self.request("POST /api/auth/signup", "POST", "/api/auth/signup", scheduled,
+                           json={"name": "Load User", **credentials})
+        await self.request("POST /api/auth/login", "POST", "/api/auth/login", time.perf_counter(),
+                           json=credentials)
+
+    async def log_meal(self, scheduled: float):
+        await self.request("POST /api/nutrition/add-meal", "POST", "/api/nutrition/add-meal", scheduled, json={
+            "userId": self.rng.choice(self.users),
+            "name": "Chicken and rice",
+            "calories": 650, "protein": 45, "carbs": 70, "fats": 15,
+            "date": date.today().isoformat(),
+        })
+
+    async def dashboard(self, scheduled: float):
+        user_id = self.rng.choice(self.users)
+        await self.request("GET /api/users/{user_id}/dashboard", "GET", f"/api/users/{user_id}/dashboard", scheduled)
+
+    async def ai_chat(self, scheduled: float):
+        await self.request("POST /api/ai/chat", "POST", "/api/ai/chat", scheduled, json={
+            "userId": self.rng.choice(self.users),
+            "message": "How many rest days should I take this week?",
+        })
+
+    async def ai_workout(self, scheduled: float):
+        await self.request("POST /api/ai/generate-workout", "POST", "/api/ai/generate-workout", scheduled, json={
+            "userId": self.rng.choice(self.users),
+            "prompt": self.rng.choice(["upper body strength", "30 minute cardio", "leg day", "mobility"]),
+        })
+
+
+def parse_mix(spec: str):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Scenarios, name.strip()):
+            raise SystemExit(f"unknown scenario: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def load_server(args):
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    if args.mongomock:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+        os.environ["MONGO_WARM_CONNECTIONS"] = "0"
+
+    import server
+    if args.mongomock:
+        # mongomock ignores partialFilterExpression, so the idempotency index
+        # would reject every second row written without an idempotencyKey
+        server.ensure_indexes = functools.partial(server.ensure_indexes, partial=False)
+    FakeLlmChat.latency = args.llm_latency
+    FakeLlmChat.jitter = args.llm_jitter
+    FakeLlmChat.rng = random.Random(args.seed)
+    server.new_llm_chat = lambda session_id, system_message: FakeLlmChat(
+        session_id=session_id, system_message=system_message
+    )
+    server.new_user_message = FakeUserMessage
+    # FakeLlmChat streams token by token
+    server.chat_streaming_supported = lambda: True
+    return server
+
+
+async def create_users(client: httpx.AsyncClient, count: int):
+    users = []
+    for i in range(count):
+        response = await client.post("/api/auth/signup", json={
+            "name": f"Load User {i}", "email": f"load.seed.{i}.{uuid.uuid4().hex[:8]}@example.com",
+            "password": "load-test-password",
+        })
+        response.raise_for_status()
+        users.append(response.json()["user"]["id"])
+    return users
+
+
+async def drive(scenarios: Scenarios, mix: dict, rps: float, duration: float, max_in_flight: int, rng):
+    names, weights = list(mix), list(mix.values())
+    in_flight = set()
+    dropped = 0
+    interval = 1 / rps
+    start = time.perf_counter()
+    n = 0
+    while True:
+        scheduled = start + n * interval
+        if scheduled - start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        n += 1
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+            continue
+        scenario = getattr(scenarios, rng.choices(names, weights)[0])
+        task = asyncio.create_task(scenario(scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight, return_exceptions=True)
+    return n, dropped, time.perf_counter() - start
+
+
+def summarize(recorder: Recorder, elapsed: float, scheduled: int, dropped: int, config: dict) -> dict:
+    routes = {}
+    total = 0
+    for label, samples in sorted(recorder.samples.items()):
+        values = sorted(samples)
+        total += len(values)
+        routes[label] = {
+            "count": len(values),
+            "errors": recorder.errors.get(label, 0),
+            "p50Ms": round(percentile(values, 50) * 1000, 2),
+            "p95Ms": round(percentile(values, 95) * 1000, 2),
+            "p99Ms": round(percentile(values, 99) * 1000, 2),
+            "maxMs": round(values[-1] * 1000, 2),
+        }
+    return {
+        "config": config,
+        "elapsedS": round(elapsed, 2),
+        "scheduled": scheduled,
+        "dropped": dropped,
+        "requests": total,
+        "errors": sum(recorder.errors.values()),
+        "throughputRps": round(total / elapsed, 2) if elapsed else 0.0,
+        "routes": routes,
+    }
+
+
+def print_report(report: dict, baseline: dict = None):
+    print(f"{report['requests']} requests in {report['elapsedS']}s "
+          f"({report['throughputRps']} req/s, {report['errors']} errors, {report['dropped']} dropped)")
+    header = f"{'route':<40} {'count':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    if baseline:
+        header += f" {'p95 Δ':>8}"
+    print(header)
+    for label, row in report["routes"].items():
+        line = f"{label:<40} {row['count']:>6} {row['errors']:>4} {row['p50Ms']:>8} {row['p95Ms']:>8} {row['p99Ms']:>8}"
+        previous = (baseline or {}).get("routes", {}).get(label)
+        if previous and previous["p95Ms"]:
+            line += f" {(row['p95Ms'] / previous['p95Ms'] - 1) * 100:>+7.1f}%"
+        print(line)
+    if baseline and baseline.get("throughputRps"):
+        change = (report["throughputRps"] / baseline["throughputRps"] - 1) * 100
+        print(f"throughput vs baseline: {change:+.1f}%")
+
+
+async def run(args):
+    server = load_server(args)
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    config = {
+        "rps": args.rps, "duration": args.duration, "mix": args.mix, "users": args.users,
+        "llmLatency": args.llm_latency, "mongo": "mongomock" if args.mongomock else "mongod",
+    }
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with server.app.router.lifespan_context(server.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=args.timeout) as client:
+                users = await create_users(client, args.users)
+                scenarios = Scenarios(client, recorder, users, rng)
+                scheduled, dropped, elapsed = await drive(
+                    scenarios, parse_mix(args.mix), args.rps, args.duration, args.max_in_flight, rng
+                )
+    finally:
+        if not args.mongomock:
+            await server.client.drop_database(args.db_name)
+    return summarize(recorder, elapsed, scheduled, dropped, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of scheduled arrivals")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--users", type=int, default=20, help="users created before the run")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="arrivals beyond this are dropped")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-url", default=os.environ.get("LOAD_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=f"fitgenius_load_{os.getpid()}")
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of mongod")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(report, baseline)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    if report["errors"]:
+        print(f"{report['errors']} request(s) failed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
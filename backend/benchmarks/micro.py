@@ -0,0 +1,198 @@
+"""Microbenchmarks for backend hot paths with a regression gate.
+
+Each benchmark runs against synthetic data at several scales (documents
+per user) and reports the best per-call time over `--repeat` rounds.
+`--save` stores the results as JSON; `--baseline` compares against a
+stored run and exits non-zero when any benchmark is more than
+`--threshold` slower. Run from the backend directory:
+
+    python benchmarks/micro.py --save benchmarks/baseline.json
+    python benchmarks/micro.py --baseline benchmarks/baseline.json [--threshold 0.15]
+
+Baselines are only comparable on the same machine and Python version; a
+mismatch is reported before the comparison.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from passlib.context import CryptContext  # noqa: E402
+
+from ai_workout import parse_workout  # noqa: E402
+from fast_json import dumps  # noqa: E402
+from nutrition import daily_totals  # noqa: E402
+from serialization import make_workout_plans  # noqa: E402
+from streaks import streak_from_dates  # noqa: E402
+
+SCALES = (10, 1000, 100000)
+
+
+def workout_dates(count: int, seed: int = 0):
+    # Mostly consecutive days with occasional gaps, ascending
+    rng = random.Random(seed)
+    day = date(1900, 1, 1)
+    dates = []
+    for _ in range(count):
+        day += timedelta(days=1 if rng.random() < 0.8 else rng.randint(2, 4))
+        dates.append(day.isoformat())
+    return dates
+
+
+def meals(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    start = date(2000, 1, 1)
+    return [
+        {
+            "userId": "bench-user",
+            "date": (start + timedelta(days=i // 4)).isoformat(),
+            "calories": rng.uniform(100, 900),
+            "protein": rng.uniform(0, 60),
+            "carbs": rng.uniform(0, 120),
+            "fats": rng.uniform(0, 40),
+        }
+        for i in range(count)
+    ]
+
+
+def workout_response(exercises: int) -> str:
+    plan = {
+        "name": "Synthetic Plan",
+        "description": "Generated for benchmarking",
+        "duration": 45,
+        "exercises": [{"name": f"Exercise {i}", "sets": 3, "reps": "8-12", "rest": "60s"} for i in range(exercises)],
+    }
+    return f"```json\n{json.dumps(plan, indent=2)}\n```"
+
+
+def bench_streak_from_dates(scale: int):
+    dates = workout_dates(scale)
+    return lambda: streak_from_dates(dates)
+
+
+def bench_daily_totals(scale: int):
+    docs = meals(scale)
+    return lambda: daily_totals(docs)
+
+
+def bench_parse_workout_response(scale: int):
+    text = workout_response(scale)
+    return lambda: parse_workout(text)
+
+
+def bench_repair_workout_response(scale: int):
+    # Prose before the object and a reply cut off mid-array
+    text = "Here is your plan:\n" + workout_response(scale)[8:-44]
+    return lambda: parse_workout(text)
+
+
+def bench_encode_workout_plans(scale: int):
+    payload = {"success": True, "workoutPlans": make_workout_plans(scale)}
+    return lambda: dumps(payload)
+
+
+def bench_bcrypt_verify(scale: int):
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    hashed = context.hash("benchmark-password")
+    return lambda: context.verify("benchmark-password", hashed)
+
+
+# name -> (setup(scale) returning the callable to time, scales)
+BENCHMARKS = {
+    "streak_from_dates": (bench_streak_from_dates, SCALES),
+    "daily_totals": (bench_daily_totals, SCALES),
+    # scale is the number of exercises in one generated plan
+    "parse_workout_response": (bench_parse_workout_response, (10, 1000)),
+    "repair_workout_response": (bench_repair_workout_response, (10, 1000)),
+    "encode_workout_plans": (bench_encode_workout_plans, SCALES),
+    "bcrypt_verify": (bench_bcrypt_verify, (1,)),
+}
+
+
+def measure(fn, repeat: int, min_time: float = 0.05) -> float:
+    # Grow the loop count until one round takes at least min_time
+    number = 1
+    while True:
+        elapsed = timeit.timeit(fn, number=number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    best = min([elapsed] + timeit.repeat(fn, number=number, repeat=repeat - 1)) if repeat > 1 else elapsed
+    return best / number
+
+
+def run(names, max_scale: int, repeat: int) -> dict:
+    results = {}
+    for name in names:
+        setup, scales = BENCHMARKS[name]
+        for scale in scales:
+            if scale > max_scale:
+                continue
+            key = f"{name}[{scale}]"
+            results[key] = round(measure(setup(scale), repeat) * 1e6, 3)
+            print(f"{key:<36} {results[key]:>14.3f} us", flush=True)
+    return results
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(), "node": platform.node()}
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Returns (rows, regressions); a regression is slower than baseline by more than threshold."""
+    rows, regressions = [], []
+    for key, current in results.items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            continue
+        change = current / previous - 1
+        rows.append((key, previous, current, change))
+        if change > threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--max-scale", type=int, default=max(SCALES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, 0.15 = 15%%")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = run(names, args.max_scale, args.repeat)
+    report = {"environment": environment(), "createdAt": datetime.utcnow().isoformat(), "results": results}
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+
+    if not args.baseline:
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text())
+    if baseline.get("environment") != report["environment"]:
+        print(f"warning: baseline environment {baseline.get('environment')} differs from {report['environment']}")
+    rows, regressions = compare(results, baseline, args.threshold)
+    print(f"\n{'benchmark':<36} {'baseline us':>14} {'current us':>14} {'change':>8}")
+    for key, previous, current, change in rows:
+        flag = "  REGRESSION" if key in regressions else ""
+        print(f"{key:<36} {previous:>14.3f} {current:>14.3f} {change * 100:>+7.1f}%{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold * 100:.0f}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
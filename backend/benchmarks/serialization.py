@@ -0,0 +1,83 @@
+"""Compare response encoding paths for workout_plans-sized payloads.
+
+Baseline is what FastAPI does for a plain dict return: `jsonable_encoder`
+followed by `json.dumps` in `JSONResponse.render`. The fast path is
+`fast_json.dumps` (orjson). Run from the backend directory:
+
+    python benchmarks/serialization.py [--sizes 100,1000,10000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from fast_json import dumps  # noqa: E402
+
+
+def make_workout_plans(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "userId": "bench-user",
+            "name": f"Plan {i}",
+            "description": "Full body strength and conditioning",
+            "duration": rng.choice([30, 45, 60]),
+            "exercises": [
+                {"name": f"Exercise {j}", "sets": rng.randint(2, 5), "reps": "8-12", "rest": "60s"}
+                for j in range(6)
+            ],
+            "createdAt": start + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def baseline(payload):
+    encoded = jsonable_encoder(payload, custom_encoder={ObjectId: str})
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast(payload):
+    return dumps(payload)
+
+
+def run(sizes, repeat: int):
+    results = []
+    for size in sizes:
+        payload = {"success": True, "workoutPlans": make_workout_plans(size)}
+        number = max(1, 1000 // size)
+        row = {"documents": size}
+        for name, fn in (("jsonable_encoder+json", baseline), ("orjson", fast)):
+            best = min(timeit.repeat(lambda: fn(payload), number=number, repeat=repeat)) / number
+            row[name] = round(best * 1000, 3)
+        row["speedup"] = round(row["jsonable_encoder+json"] / row["orjson"], 1)
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(",")], args.repeat)
+    print(f"{'docs':>8} {'jsonable_encoder+json (ms)':>28} {'orjson (ms)':>12} {'speedup':>8}")
+    for row in results:
+        print(f"{row['documents']:>8} {row['jsonable_encoder+json']:>28} {row['orjson']:>12} {str(row['speedup']) + 'x':>8}")
+
+
+if __name__ == "__main__":
+    main()
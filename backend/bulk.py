@@ -0,0 +1,96 @@
+"""Shared plumbing for the bulk ingestion endpoints.
+
+Items are validated one by one so a bad row is reported instead of failing
+the batch, then written with a single unordered `insert_many`. Items may
+carry an `idempotencyKey`; a unique partial index on (userId,
+idempotencyKey) turns retried rows into "duplicate" results, carrying the
+stored document's id, rather than new documents.
+
+Rollups derived from these rows are written after the insert, so a retry
+may follow a request whose rollup step failed. Callers recompute the
+rollups touched by duplicates, which makes the retry repair them.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, List
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+MAX_BULK_ITEMS = 1000
+DUPLICATE_KEY = 11000
+
+
+def validate_items(items: List[Any], model):
+    """Return ([(index, document)], {index: result}) for valid and invalid items."""
+    valid = []
+    results = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {"index": index, "status": "invalid", "error": "Item must be an object"}
+            continue
+        try:
+            parsed = model(**item)
+        except (ValidationError, TypeError) as e:
+            errors = e.errors() if isinstance(e, ValidationError) else [{"msg": str(e)}]
+            results[index] = {"index": index, "status": "invalid", "error": errors[0]["msg"]}
+            continue
+        doc = {"id": str(uuid.uuid4()), **parsed.dict(exclude_none=True), "createdAt": datetime.utcnow()}
+        valid.append((index, doc))
+    return valid, results
+
+
+async def insert_items(collection, valid, results: dict):
+    """Insert valid documents; returns (written, duplicates).
+
+    `duplicates` are the previously stored documents the retried items
+    collided with.
+    """
+    if not valid:
+        return [], []
+    failed = {}
+    try:
+        await collection.insert_many([{**doc} for _, doc in valid], ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = error
+
+    duplicate_keys = [
+        (doc["userId"], doc.get("idempotencyKey"))
+        for position, (_, doc) in enumerate(valid)
+        if failed.get(position, {}).get("code") == DUPLICATE_KEY
+    ]
+    existing = {}
+    if duplicate_keys:
+        cursor = collection.find(
+            {"$or": [{"userId": user_id, "idempotencyKey": key} for user_id, key in duplicate_keys]},
+            {"_id": 0},
+        )
+        existing = {(doc["userId"], doc.get("idempotencyKey")): doc async for doc in cursor}
+
+    written, duplicates = [], []
+    for position, (index, doc) in enumerate(valid):
+        error = failed.get(position)
+        if error is None:
+            results[index] = {"index": index, "status": "inserted", "id": doc["id"]}
+            written.append(doc)
+        elif error.get("code") == DUPLICATE_KEY:
+            stored = existing.get((doc["userId"], doc.get("idempotencyKey")))
+            results[index] = {"index": index, "status": "duplicate", "id": stored["id"] if stored else None}
+            if stored:
+                duplicates.append(stored)
+        else:
+            results[index] = {"index": index, "status": "failed", "error": error.get("errmsg", "write failed")}
+    return written, duplicates
+
+
+def summarize(results: dict, total: int) -> dict:
+    ordered = [results[i] for i in range(total)]
+    counts = {"inserted": 0, "duplicate": 0, "invalid": 0, "failed": 0}
+    for result in ordered:
+        counts[result["status"]] += 1
+    return {
+        "success": counts["invalid"] == 0 and counts["failed"] == 0,
+        **counts,
+        "results": ordered,
+    }
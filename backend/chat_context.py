@@ -0,0 +1,110 @@
+"""Bounded conversational context for the AI coach.
+
+The prompt for each chat turn is the most recent messages that fit a token
+budget plus a rolling summary of everything older. The summary lives in
+`chat_summaries` and is extended incrementally: once enough unsummarized
+messages have fallen out of the recent window, they are folded into the
+previous summary with one short LLM call.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks; hold summary
+# refreshes here until they finish so they cannot be collected mid-flight
+_background_tasks = set()
+
+
+def _track(task: asyncio.Task, description: str):
+    _background_tasks.add(task)
+
+    def done(task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"{description} failed: {task.exception()!r}")
+
+    task.add_done_callback(done)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for budgeting
+    return len(text) // 4 + 1
+
+
+def format_turn(message: dict) -> str:
+    speaker = "User" if message.get("isUser") else "Coach"
+    return f"{speaker}: {message.get('text', '')}"
+
+
+class ChatContextBuilder:
+    def __init__(self, db, summarizer, max_turns: int = 12, token_budget: int = 1500,
+                 summarize_after: int = 10, summary_batch: int = 50):
+        self.db = db
+        self.summarizer = summarizer
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarize_after = summarize_after
+        self.summary_batch = summary_batch
+        self._refreshing = set()
+
+    async def build(self, user_id: str):
+        """Return (context text, timestamp of the oldest message included)."""
+        recent, summary = await asyncio.gather(
+            self.db.chat_messages.find(
+                {"userId": user_id}, {"_id": 0, "text": 1, "isUser": 1, "timestamp": 1}
+            ).sort("timestamp", -1).limit(self.max_turns).to_list(self.max_turns),
+            self.db.chat_summaries.find_one({"userId": user_id}, {"_id": 0, "summary": 1}),
+        )
+
+        summary_text = summary["summary"] if summary else ""
+        budget = self.token_budget - estimate_tokens(summary_text)
+        turns = []
+        oldest = None
+        # Newest first, so the budget always keeps the latest exchange
+        for message in recent:
+            line = format_turn(message)
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            budget -= cost
+            turns.append(line)
+            oldest = message["timestamp"]
+
+        sections = []
+        if summary_text:
+            sections.append(f"Summary of earlier conversation:\n{summary_text}")
+        if turns:
+            sections.append("Recent conversation:\n" + "\n".join(reversed(turns)))
+        return "\n\n".join(sections), oldest
+
+    def schedule_refresh(self, user_id: str, before):
+        if before is None or user_id in self._refreshing:
+            return
+        self._refreshing.add(user_id)
+        task = asyncio.ensure_future(self._refresh(user_id, before))
+        _track(task, f"Chat summary refresh for {user_id}")
+        task.add_done_callback(lambda _: self._refreshing.discard(user_id))
+
+    async def _refresh(self, user_id: str, before):
+        try:
+            state = await self.db.chat_summaries.find_one({"userId": user_id}, {"_id": 0}) or {}
+            query = {"userId": user_id, "timestamp": {"$lt": before}}
+            if state.get("coveredUntil"):
+                query["timestamp"]["$gt"] = state["coveredUntil"]
+            pending = await self.db.chat_messages.find(
+                query, {"_id": 0, "text": 1, "isUser": 1, "timestamp": 1}
+            ).sort("timestamp", 1).limit(self.summary_batch).to_list(self.summary_batch)
+            if len(pending) < self.summarize_after:
+                return
+
+            summary = await self.summarizer(
+                state.get("summary", ""), "\n".join(format_turn(m) for m in pending)
+            )
+            await self.db.chat_summaries.update_one(
+                {"userId": user_id},
+                {"$set": {"summary": summary.strip(), "coveredUntil": pending[-1]["timestamp"]}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to refresh chat summary for {user_id}: {str(e)}")
@@ -0,0 +1,41 @@
+"""Streaming NDJSON export of a user's history.
+
+Documents are read from Motor cursors in fixed-size batches and emitted as
+one JSON object per line, optionally through an incremental gzip
+compressor, so memory stays bounded by the batch size however much
+history the user has.
+"""
+import zlib
+
+from fast_json import dumps
+
+EXPORT_COLLECTIONS = ("meals", "weight_entries", "workout_logs", "workout_plans", "chat_messages")
+
+
+async def _ndjson_batches(db, user_id: str, collections, batch_size: int):
+    for name in collections:
+        cursor = db[name].find({"userId": user_id}, {"_id": 0}).batch_size(batch_size)
+        lines = []
+        async for doc in cursor:
+            lines.append(dumps({"collection": name, "data": doc}))
+            if len(lines) >= batch_size:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+
+
+async def export_user_history(db, user_id: str, collections=EXPORT_COLLECTIONS,
+                              batch_size: int = 500, compress: bool = False):
+    if not compress:
+        async for chunk in _ndjson_batches(db, user_id, collections, batch_size):
+            yield chunk
+        return
+
+    # wbits=31 writes a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in _ndjson_batches(db, user_id, collections, batch_size):
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
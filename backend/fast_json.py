@@ -0,0 +1,41 @@
+"""orjson-backed response encoding.
+
+`FastJSONResponse` is the app's default response class. orjson encodes
+datetimes natively and `_default` covers the few BSON/Pydantic types that
+can reach a response, so handlers that return a `FastJSONResponse` (or
+pre-encoded bytes) directly skip FastAPI's recursive `jsonable_encoder`
+pass entirely.
+"""
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # Cached payloads arrive already encoded
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
@@ -0,0 +1,183 @@
+"""MongoDB index declarations and query-plan verification.
+
+Indexes are created idempotently at startup. Run this module directly to
+create them against the configured database and verify that every route
+query shape is index-backed:
+
+    python indexes.py --check
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from jobs import CLAIM_SORT, claim_filter
+from nutrition import summary_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Indexes required by the hot route queries, per collection
+# Retried bulk items carry an idempotencyKey; only those rows are indexed
+IDEMPOTENCY_INDEX = IndexModel(
+    [("userId", ASCENDING), ("idempotencyKey", ASCENDING)],
+    name="userId_idempotencyKey_unique",
+    unique=True,
+    partialFilterExpression={"idempotencyKey": {"$exists": True}},
+)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "workout_logs": [
+        IndexModel([("userId", ASCENDING), ("date", DESCENDING)], name="userId_date"),
+        IDEMPOTENCY_INDEX,
+    ],
+    "user_streaks": [
+        IndexModel([("userId", ASCENDING)], name="userId_unique", unique=True),
+    ],
+    "workout_plans": [
+        IndexModel([("userId", ASCENDING), ("createdAt", DESCENDING)], name="userId_createdAt"),
+    ],
+    "meals": [
+        IndexModel([("userId", ASCENDING), ("date", ASCENDING), ("createdAt", ASCENDING)],
+                   name="userId_date_createdAt"),
+        IDEMPOTENCY_INDEX,
+    ],
+    "nutrition_daily": [
+        IndexModel([("userId", ASCENDING), ("date", ASCENDING)], name="userId_date_unique", unique=True),
+    ],
+    "weight_entries": [
+        IndexModel([("userId", ASCENDING), ("date", ASCENDING)], name="userId_date"),
+        IDEMPOTENCY_INDEX,
+    ],
+    "weight_buckets": [
+        IndexModel([("userId", ASCENDING), ("month", ASCENDING)], name="userId_month_unique", unique=True),
+    ],
+    "measurements": [
+        IndexModel([("userId", ASCENDING)], name="userId"),
+    ],
+    "llm_cache": [
+        IndexModel([("key", ASCENDING)], name="key_unique", unique=True),
+        IndexModel([("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0),
+    ],
+    "llm_leases": [
+        IndexModel([("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0),
+    ],
+    "request_profiles": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("createdAt", DESCENDING)], name="createdAt_desc"),
+        IndexModel([("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0),
+    ],
+    "ai_jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("runAfter", ASCENDING)], name="status_runAfter"),
+        IndexModel([("status", ASCENDING), ("leaseExpiresAt", ASCENDING)], name="status_leaseExpiresAt"),
+    ],
+    "chat_summaries": [
+        IndexModel([("userId", ASCENDING)], name="userId_unique", unique=True),
+    ],
+    "chat_messages": [
+        IndexModel([("userId", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)],
+                   name="userId_timestamp_id"),
+    ],
+}
+
+# Query shapes issued by the routes: (label, collection, filter, sort); a
+# list in place of the filter is an aggregation pipeline, explained as such
+QUERY_SHAPES = [
+    ("signup/login", "users", {"email": "probe@example.com"}, None),
+    ("stats workouts this week", "workout_logs", {"userId": "probe", "date": {"$gte": "2000-01-01"}}, None),
+    ("streak", "user_streaks", {"userId": "probe"}, None),
+    ("streak rebuild", "workout_logs", {"userId": "probe"}, [("date", DESCENDING)]),
+    ("progress total workouts", "workout_logs", {"userId": "probe"}, None),
+    ("workouts", "workout_plans", {"userId": "probe"}, None),
+    ("dashboard recent plans", "workout_plans", {"userId": "probe"}, [("createdAt", DESCENDING)]),
+    ("dashboard latest weight", "weight_entries", {"userId": "probe"}, [("date", DESCENDING)]),
+    ("nutrition totals", "nutrition_daily", {"userId": "probe", "date": "2000-01-01"}, None),
+    ("nutrition summary", "meals", summary_pipeline("probe", "2000-01-01", "2000-12-31", "week"), None),
+    ("nutrition meals", "meals", {"userId": "probe", "date": "2000-01-01"}, [("createdAt", ASCENDING)]),
+    ("progress weight", "weight_entries", {"userId": "probe"}, [("date", DESCENDING)]),
+    ("progress weight series", "weight_buckets", {"userId": "probe", "month": {"$in": ["2000-01"]}}, None),
+    ("progress measurements", "measurements", {"userId": "probe"}, None),
+    ("ai job status", "ai_jobs", {"id": "probe"}, None),
+    ("ai job claim", "ai_jobs", claim_filter(datetime(2000, 1, 1)), CLAIM_SORT),
+    ("chat history", "chat_messages", {"userId": "probe"}, [("timestamp", DESCENDING), ("id", DESCENDING)]),
+    ("chat context", "chat_messages", {"userId": "probe"}, [("timestamp", DESCENDING)]),
+    ("chat summary", "chat_summaries", {"userId": "probe"}, None),
+    ("admin profiles", "request_profiles", {}, [("createdAt", DESCENDING)]),
+    ("admin profile", "request_profiles", {"id": "probe"}, None),
+]
+
+
+async def ensure_indexes(db, partial: bool = True):
+    """Create INDEXES; partial=False skips partial indexes for backends that ignore the filter."""
+    for collection, models in INDEXES.items():
+        if not partial:
+            models = [model for model in models if "partialFilterExpression" not in model.document]
+        try:
+            await db[collection].create_indexes(models)
+        except Exception as e:
+            # A conflicting or unbuildable index must not take the API down
+            logger.error(f"Failed to create indexes on {collection}: {str(e)}")
+
+
+def _plan_stages(plan):
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def check_query_plans(db):
+    """Return a list of (label, collection, stages) for shapes that scan the collection."""
+    failures = []
+    for label, collection, query, sort in QUERY_SHAPES:
+        if isinstance(query, list):
+            explain = await db.command("aggregate", collection, pipeline=query, explain=True)
+            # Pipelines the query layer cannot absorb report the plan under $cursor
+            planner = explain.get("queryPlanner") or explain["stages"][0]["$cursor"]["queryPlanner"]
+        else:
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            planner = (await cursor.explain())["queryPlanner"]
+        stages = list(_plan_stages(planner["winningPlan"]))
+        if "COLLSCAN" in stages:
+            failures.append((label, collection, stages))
+    return failures
+
+
+async def _main(check: bool):
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        await ensure_indexes(db)
+        print("Indexes ensured")
+        if not check:
+            return 0
+        failures = await check_query_plans(db)
+        for label, collection, stages in failures:
+            print(f"COLLSCAN: {label} on {collection} ({' -> '.join(stages)})")
+        if failures:
+            return 1
+        print(f"All {len(QUERY_SHAPES)} query shapes are index-backed")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main("--check" in sys.argv[1:])))
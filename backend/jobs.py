@@ -0,0 +1,228 @@
+"""Mongo-backed job queue for long-running AI work.
+
+Jobs live in `ai_jobs` and move through queued -> running -> succeeded or
+failed. Workers claim jobs with an atomic find-and-update that also sets a
+lease and extend it with a heartbeat while the handler runs, so a job held
+by a crashed worker is picked up again once its lease expires. Failed and
+abandoned attempts are retried with backoff up to `maxAttempts`.
+
+The API process runs AI_JOB_WORKERS in-process workers. To drain the queue
+from a dedicated process instead, set AI_JOB_WORKERS=0 on the API and run:
+
+    python jobs.py
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def claim_filter(now: datetime) -> dict:
+    return {"$or": [
+        {"status": QUEUED, "runAfter": {"$lte": now}},
+        # Lease ran out: the worker holding it is gone
+        {"status": RUNNING, "leaseExpiresAt": {"$lt": now}, "$expr": {"$lt": ["$attempts", "$maxAttempts"]}},
+    ]}
+
+
+CLAIM_SORT = [("runAfter", 1)]
+
+
+class JobQueue:
+    def __init__(self, db, lease_seconds: float = 120.0, max_attempts: int = 3, retry_backoff: float = 5.0):
+        self.db = db
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, job_type: str, payload: dict, user_id: str) -> dict:
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "userId": user_id,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "maxAttempts": self.max_attempts,
+            "result": None,
+            "error": None,
+            "runAfter": now,
+            "leaseExpiresAt": None,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        await self.db.ai_jobs.insert_one({**job})
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str):
+        return await self.db.ai_jobs.find_one({"id": job_id}, {"_id": 0, "payload": 0})
+
+    async def claim(self):
+        now = datetime.utcnow()
+        job = await self.db.ai_jobs.find_one_and_update(
+            claim_filter(now),
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds),
+                    "updatedAt": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=CLAIM_SORT,
+            return_document=ReturnDocument.AFTER,
+        )
+        # Not projected away: mongomock (used by the load harness) then
+        # re-reads the updated job with the claim filter and finds nothing
+        if job is not None:
+            job.pop("_id", None)
+        return job
+
+    async def heartbeat(self, job: dict) -> bool:
+        """Extend the lease; False once the job was re-claimed or finished elsewhere."""
+        now = datetime.utcnow()
+        result = await self.db.ai_jobs.update_one(
+            {"id": job["id"], "status": RUNNING, "attempts": job["attempts"]},
+            {"$set": {"leaseExpiresAt": now + timedelta(seconds=self.lease_seconds), "updatedAt": now}},
+        )
+        return result.matched_count > 0
+
+    async def fail_abandoned(self) -> int:
+        """Fail jobs whose final attempt lost its lease; claim() no longer picks them up."""
+        now = datetime.utcnow()
+        result = await self.db.ai_jobs.update_many(
+            {"status": RUNNING, "leaseExpiresAt": {"$lt": now},
+             "$expr": {"$gte": ["$attempts", "$maxAttempts"]}},
+            {"$set": {"status": FAILED, "error": "Lease expired on the final attempt",
+                      "leaseExpiresAt": None, "updatedAt": now}},
+        )
+        return result.modified_count
+
+    async def complete(self, job: dict, result: dict):
+        await self.db.ai_jobs.update_one(
+            {"id": job["id"], "status": RUNNING, "attempts": job["attempts"]},
+            {"$set": {"status": SUCCEEDED, "result": result, "error": None,
+                      "leaseExpiresAt": None, "updatedAt": datetime.utcnow()}},
+        )
+
+    async def fail(self, job: dict, error: str):
+        now = datetime.utcnow()
+        if job["attempts"] < job["maxAttempts"]:
+            update = {"status": QUEUED,
+                      "runAfter": now + timedelta(seconds=self.retry_backoff * job["attempts"])}
+        else:
+            update = {"status": FAILED}
+        await self.db.ai_jobs.update_one(
+            {"id": job["id"], "status": RUNNING, "attempts": job["attempts"]},
+            {"$set": {**update, "error": error, "leaseExpiresAt": None, "updatedAt": now}},
+        )
+
+    async def wait_for_work(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class JobWorker:
+    def __init__(self, queue: JobQueue, handlers: dict, concurrency: int = 2, poll_interval: float = 1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        self._tasks = [asyncio.ensure_future(self._loop()) for _ in range(self.concurrency)]
+
+    async def run(self):
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self):
+        while not self._stopping:
+            try:
+                job = await self.queue.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim AI job: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await self.queue.fail_abandoned()
+                except Exception as e:
+                    logger.error(f"Failed to fail abandoned AI jobs: {str(e)}")
+                await self.queue.wait_for_work(self.poll_interval)
+                continue
+            await self._run(job)
+
+    async def _heartbeat(self, job: dict):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self.queue.heartbeat(job):
+                    logger.warning(f"AI job {job['id']} attempt {job['attempts']} lost its lease")
+                    return
+            except Exception as e:
+                logger.error(f"Failed to extend lease of AI job {job['id']}: {str(e)}")
+
+    async def _run(self, job: dict):
+        handler = self.handlers.get(job["type"])
+        heartbeat = asyncio.ensure_future(self._heartbeat(job))
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job type {job['type']}")
+            result = await handler(job["payload"])
+        except asyncio.CancelledError:
+            # Leave the job running; its lease expiry hands it to another worker
+            raise
+        except Exception as e:
+            logger.error(f"AI job {job['id']} attempt {job['attempts']} failed: {str(e)}")
+            await self.queue.fail(job, str(e))
+            return
+        finally:
+            heartbeat.cancel()
+        await self.queue.complete(job, result)
+
+
+async def _main():
+    import server
+
+    worker = JobWorker(
+        server.job_queue,
+        server.job_handlers,
+        concurrency=int(os.environ.get("AI_JOB_STANDALONE_WORKERS", "4")),
+    )
+    try:
+        await worker.run()
+    finally:
+        server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
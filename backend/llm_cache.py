@@ -0,0 +1,94 @@
+"""Two-tier response cache for LLM generations.
+
+Keys are derived from a normalized prompt plus the system message and
+model, so "30 min Full-Body beginner" and "beginner full body 30 min" hit
+the same entry. The local tier is an in-process LRU with TTL; the optional
+persistent tier lives in the `llm_cache` collection and expires through a
+TTL index.
+"""
+import copy
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta
+
+from cachetools import TTLCache
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(sorted(_TOKEN_RE.findall(prompt.lower())))
+
+
+class LLMResponseCache:
+    def __init__(self, db=None, namespace: str = "default", maxsize: int = 512, ttl: int = 3600,
+                 persistent: bool = False):
+        self.db = db
+        self.namespace = namespace
+        self.ttl = ttl
+        self.persistent = persistent and db is not None
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._counters = {"localHits": 0, "persistentHits": 0, "misses": 0, "bypassed": 0}
+
+    def key(self, prompt: str, system_message: str, model: str) -> str:
+        raw = "\x1f".join((self.namespace, model, system_message.strip(), normalize_prompt(prompt)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    async def get(self, key: str, record: bool = True):
+        with self._lock:
+            value = self._local.get(key)
+        if value is not None:
+            if record:
+                self._count("localHits")
+            return copy.deepcopy(value)
+
+        if self.persistent:
+            doc = await self.db.llm_cache.find_one(
+                {"key": key, "expiresAt": {"$gt": datetime.utcnow()}}, {"_id": 0, "value": 1}
+            )
+            if doc:
+                if record:
+                    self._count("persistentHits")
+                with self._lock:
+                    self._local[key] = doc["value"]
+                return copy.deepcopy(doc["value"])
+
+        if record:
+            self._count("misses")
+        return None
+
+    async def set(self, key: str, value):
+        with self._lock:
+            self._local[key] = copy.deepcopy(value)
+        if self.persistent:
+            await self.db.llm_cache.update_one(
+                {"key": key},
+                {"$set": {
+                    "namespace": self.namespace,
+                    "value": value,
+                    "expiresAt": datetime.utcnow() + timedelta(seconds=self.ttl),
+                }},
+                upsert=True,
+            )
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._local)
+        lookups = counters["localHits"] + counters["persistentHits"] + counters["misses"]
+        hits = counters["localHits"] + counters["persistentHits"]
+        return {
+            **counters,
+            "localSize": size,
+            "persistent": self.persistent,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+        }
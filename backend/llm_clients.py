@@ -0,0 +1,135 @@
+"""App-scoped LLM clients with pooled keep-alive connections.
+
+`LLMClientRegistry` keeps one OpenAI-compatible client per (provider,
+model), each on its own httpx connection pool, so requests reuse warm TLS
+connections instead of building a client and handshaking per call.
+`chat()` hands out lightweight `PooledChat` sessions that carry the
+per-request system message and session id on top of the shared transport
+and expose LlmChat's `send_message` plus a token-level `stream_message`.
+
+Pooling needs an OpenAI-compatible endpoint (`LLM_BASE_URL`). Without one
+the registry falls back to a fresh emergentintegrations `LlmChat` per
+request, imported on first use. LlmChat cannot stream, so
+`supports_streaming` is only true for pooled registries.
+"""
+import os
+
+import httpx
+
+
+class TextMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class PooledChat:
+    def __init__(self, client, model: str, session_id: str, system_message: str):
+        self.client = client
+        self.model = model
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def _messages(self, user_message):
+        return [
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": user_message.text},
+        ]
+
+    async def send_message(self, user_message) -> str:
+        completion = await self.client.chat.completions.create(
+            model=self.model, messages=self._messages(user_message)
+        )
+        return completion.choices[0].message.content or ""
+
+    async def stream_message(self, user_message):
+        stream = await self.client.chat.completions.create(
+            model=self.model, messages=self._messages(user_message), stream=True
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Closing the response stops the upstream generation
+            await stream.close()
+
+
+class LLMClientRegistry:
+    def __init__(self, api_key: str, base_url: str = None, timeout: float = 60.0,
+                 max_connections: int = 32, max_keepalive: int = 16, keepalive_expiry: float = 60.0,
+                 verify=True):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.verify = verify
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._clients = {}
+
+    @property
+    def pooled(self) -> bool:
+        return bool(self.base_url)
+
+    @property
+    def supports_streaming(self) -> bool:
+        return self.pooled
+
+    def client(self, provider: str, model: str):
+        key = (provider, model)
+        client = self._clients.get(key)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            # Retries belong to the LLM gateway, not the SDK
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                timeout=self.timeout,
+                http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout, verify=self.verify),
+            )
+            self._clients[key] = client
+        return client
+
+    def chat(self, provider: str, model: str, session_id: str, system_message: str):
+        if not self.pooled:
+            # emergentintegrations pulls in several provider SDKs; import on first AI use
+            from emergentintegrations.llm.chat import LlmChat
+            return LlmChat(
+                api_key=self.api_key, session_id=session_id, system_message=system_message
+            ).with_model(provider, model)
+        return PooledChat(self.client(provider, model), model, session_id, system_message)
+
+    def user_message(self, text: str):
+        if not self.pooled:
+            from emergentintegrations.llm.chat import UserMessage
+            return UserMessage(text=text)
+        return TextMessage(text)
+
+    def stats(self) -> dict:
+        return {
+            "pooled": self.pooled,
+            "streaming": self.supports_streaming,
+            "clients": len(self._clients),
+            "maxConnections": self.limits.max_connections,
+            "maxKeepalive": self.limits.max_keepalive_connections,
+        }
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.close()
+
+
+def create_llm_client_registry(api_key: str) -> LLMClientRegistry:
+    return LLMClientRegistry(
+        api_key=os.environ.get("LLM_API_KEY") or api_key,
+        base_url=os.environ.get("LLM_BASE_URL") or None,
+        timeout=float(os.environ.get("LLM_TIMEOUT", "60")),
+        max_connections=int(os.environ.get("LLM_MAX_CONNECTIONS", "32")),
+        max_keepalive=int(os.environ.get("LLM_MAX_KEEPALIVE", "16")),
+        keepalive_expiry=float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60")),
+    )
@@ -0,0 +1,245 @@
+"""Shared gateway for all outbound LLM calls.
+
+Every AI route goes through one `LLMGateway`, which bounds concurrency,
+queues a limited number of waiters, enforces a per-request deadline,
+retries retryable provider errors with jittered backoff and trips a
+circuit breaker after repeated failures so callers fail fast instead of
+piling onto a struggling provider. Only transport errors, timeouts and
+5xx responses count towards the breaker; a rejected request (4xx,
+validation) shows the provider is up.
+
+The gateway only sees zero-argument coroutine factories, so any stub that
+returns an awaitable can stand in for the real provider client.
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+TRANSPORT_ERROR_NAMES = {
+    "APIConnectionError", "APITimeoutError", "Timeout",
+    "ServiceUnavailableError", "InternalServerError", "ConnectionError",
+}
+RETRYABLE_ERROR_NAMES = TRANSPORT_ERROR_NAMES | {"RateLimitError"}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class LLMGatewayError(Exception):
+    status_code = 503
+
+
+class GatewayOverloaded(LLMGatewayError):
+    status_code = 503
+
+
+class CircuitOpen(LLMGatewayError):
+    status_code = 503
+
+
+class GatewayTimeout(LLMGatewayError):
+    status_code = 504
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES or isinstance(error, ConnectionError)
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Transport errors, timeouts and 5xx responses; these feed the circuit breaker."""
+    if isinstance(error, (asyncio.TimeoutError, GatewayTimeout, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status >= 500
+    return type(error).__name__ in TRANSPORT_ERROR_NAMES
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32, timeout: float = 60.0,
+                 max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._in_flight = 0
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._counters = {
+            "calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "timeouts": 0,
+            "rejectedQueueFull": 0, "rejectedCircuitOpen": 0, "circuitOpened": 0,
+        }
+
+    async def call(self, factory, timeout: float = None):
+        """Run `factory()` through the gateway, retrying retryable errors."""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(deadline):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    return await asyncio.wait_for(factory(), remaining)
+            except asyncio.TimeoutError:
+                self._counters["timeouts"] += 1
+                raise GatewayTimeout("LLM request timed out")
+            except LLMGatewayError:
+                raise
+            except Exception as e:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                if attempt >= self.max_retries or not is_retryable(e) or time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                self._counters["retries"] += 1
+                await asyncio.sleep(delay)
+
+    async def stream(self, factory, timeout: float = None):
+        """Yield from the async iterator `factory()` inside one slot.
+
+        The deadline covers admission and the whole stream, not each chunk,
+        so a provider trickling tokens cannot hold a slot indefinitely.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        try:
+            async with self.slot(deadline):
+                chunks = factory()
+                try:
+                    while True:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                        except StopAsyncIteration:
+                            return
+                        yield chunk
+                finally:
+                    aclose = getattr(chunks, "aclose", None)
+                    if aclose is not None:
+                        await aclose()
+        except asyncio.TimeoutError:
+            self._counters["timeouts"] += 1
+            raise GatewayTimeout("LLM stream timed out")
+
+    @asynccontextmanager
+    async def slot(self, deadline: float = None):
+        """Hold one concurrency slot; outcome of the body feeds the breaker."""
+        is_probe = self._admit()
+        if self._in_flight + self._waiting >= self.max_concurrency + self.max_queue:
+            self._release_probe(is_probe)
+            self._counters["rejectedQueueFull"] += 1
+            raise GatewayOverloaded("LLM gateway queue is full")
+
+        self._waiting += 1
+        try:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            await asyncio.wait_for(self._semaphore.acquire(), wait)
+        except BaseException:
+            self._release_probe(is_probe)
+            raise
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        self._counters["calls"] += 1
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # The caller went away; that says nothing about provider health
+            self._release_probe(is_probe)
+            raise
+        except BaseException as e:
+            self._counters["failed"] += 1
+            if is_provider_failure(e):
+                self._on_failure()
+            else:
+                # The provider answered; a request it rejected says nothing about its health
+                self._on_success()
+            raise
+        else:
+            self._counters["succeeded"] += 1
+            self._on_success()
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def _admit(self) -> bool:
+        if self._state == OPEN:
+            if time.monotonic() - self._opened_at < self.breaker_reset:
+                self._counters["rejectedCircuitOpen"] += 1
+                raise CircuitOpen("LLM provider circuit is open")
+            self._state = HALF_OPEN
+        if self._state == HALF_OPEN:
+            # Exactly one probe call decides whether the circuit closes
+            if self._probe_in_flight:
+                self._counters["rejectedCircuitOpen"] += 1
+                raise CircuitOpen("LLM provider circuit is half-open")
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def _release_probe(self, is_probe: bool):
+        if is_probe:
+            self._probe_in_flight = False
+
+    def _on_success(self):
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+        self._state = CLOSED
+
+    def _on_failure(self):
+        self._consecutive_failures += 1
+        self._probe_in_flight = False
+        if self._state == HALF_OPEN or self._consecutive_failures >= self.breaker_threshold:
+            if self._state != OPEN:
+                self._counters["circuitOpened"] += 1
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.breaker_reset:
+            return HALF_OPEN
+        return self._state
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "stateCode": STATE_CODES[self.state],
+            "inFlight": self._in_flight,
+            "queued": self._waiting,
+            "maxConcurrency": self.max_concurrency,
+            "maxQueue": self.max_queue,
+            "consecutiveFailures": self._consecutive_failures,
+            **self._counters,
+        }
+
+
+def create_llm_gateway() -> LLMGateway:
+    return LLMGateway(
+        max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "8")),
+        max_queue=int(os.environ.get("LLM_MAX_QUEUE", "32")),
+        timeout=float(os.environ.get("LLM_TIMEOUT", "60")),
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", "2")),
+        breaker_threshold=int(os.environ.get("LLM_BREAKER_THRESHOLD", "5")),
+        breaker_reset=float(os.environ.get("LLM_BREAKER_RESET", "30")),
+    )
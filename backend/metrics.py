@@ -0,0 +1,148 @@
+"""Prometheus metrics for the API.
+
+Request latency and in-flight counts come from the HTTP middleware, Mongo
+timings from a pymongo command listener, and LLM/bcrypt timings from the
+call sites. Components that already keep their own counters (the LLM
+gateway, auth pool and caches) are exported at scrape time through
+`StatsCollector`, so they are not double-booked.
+"""
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+registry = CollectorRegistry()
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status",
+    ["method", "route", "status"], registry=registry,
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route"], registry=registry,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", registry=registry,
+)
+MONGO_LATENCY = Histogram(
+    "mongo_operation_duration_seconds", "MongoDB command latency",
+    ["collection", "operation", "outcome"], registry=registry,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds", "LLM call latency including gateway queueing",
+    ["kind", "outcome"], registry=registry,
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Estimated LLM tokens (~4 chars/token)",
+    ["kind", "direction"], registry=registry,
+)
+AI_WORKOUT_PARSE = Counter(
+    "ai_workout_parse_total", "Generated workout replies by parse outcome (valid, repaired, llm_fixed, failed)",
+    ["outcome"], registry=registry,
+)
+AI_WORKOUT_REPAIRS = Counter(
+    "ai_workout_repairs_total", "Local JSON repairs applied to generated workouts",
+    ["fix"], registry=registry,
+)
+BCRYPT_LATENCY = Histogram(
+    "auth_bcrypt_duration_seconds", "bcrypt hash/verify time on the auth pool",
+    registry=registry, buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+BCRYPT_QUEUE_WAIT = Histogram(
+    "auth_queue_wait_seconds", "Time bcrypt jobs wait for an auth pool thread",
+    registry=registry, buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    HTTP_REQUESTS.labels(method, route, str(status)).inc()
+    HTTP_LATENCY.labels(method, route).observe(seconds)
+
+
+def observe_llm_call(kind: str, outcome: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+    LLM_LATENCY.labels(kind, outcome).observe(seconds)
+    if prompt_tokens:
+        LLM_TOKENS.labels(kind, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(kind, "completion").inc(completion_tokens)
+
+
+def observe_workout_parse(outcome: str, fixes=()):
+    AI_WORKOUT_PARSE.labels(outcome).inc()
+    for fix in fixes:
+        AI_WORKOUT_REPAIRS.labels(fix).inc()
+
+
+def observe_auth(queue_wait_seconds: float, hash_seconds: float):
+    BCRYPT_QUEUE_WAIT.observe(queue_wait_seconds)
+    BCRYPT_LATENCY.observe(hash_seconds)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "-"
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (collection, time.perf_counter())
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+    def _finish(self, event, outcome: str):
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        collection, started_at = started
+        MONGO_LATENCY.labels(collection, event.command_name, outcome).observe(time.perf_counter() - started_at)
+
+
+class StatsCollector:
+    """Exports `stats()` dicts of app components as gauges/counters at scrape time."""
+
+    def __init__(self):
+        self._sources = []
+
+    def add(self, prefix: str, stats_fn, counters=(), labels: dict = None):
+        self._sources.append((prefix, stats_fn, set(counters), labels or {}))
+
+    def collect(self):
+        # Sources sharing a prefix (e.g. one per cache endpoint) share families
+        families = {}
+        for prefix, stats_fn, counters, labels in self._sources:
+            for name, value in stats_fn().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric_name = f"{prefix}_{_snake(name)}"
+                family = families.get(metric_name)
+                if family is None:
+                    family_type = CounterMetricFamily if name in counters else GaugeMetricFamily
+                    family = family_type(metric_name, f"{prefix} {name}", labels=list(labels))
+                    families[metric_name] = family
+                family.add_metric(list(labels.values()), value)
+        yield from families.values()
+
+
+def _snake(name: str) -> str:
+    return "".join(f"_{c.lower()}" if c.isupper() else c for c in name)
+
+
+stats_collector = StatsCollector()
+registry.register(stats_collector)
+
+
+def render():
+    return generate_latest(registry), CONTENT_TYPE_LATEST
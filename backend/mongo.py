@@ -0,0 +1,49 @@
+"""MongoDB client construction and connection-pool warmup.
+
+Pool sizing and timeouts come from env. The client is created with
+`connect=False`, so importing the app opens no sockets or monitor threads;
+`warm_up` runs from the app lifespan and opens connections with
+concurrent pings so the first requests do not pay for handshakes.
+"""
+import asyncio
+import os
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# env var -> MongoClient option
+POOL_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_IDLE_MS": "maxIdleTimeMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+}
+
+
+def pool_options() -> dict:
+    return {option: int(os.environ[name]) for name, option in POOL_OPTIONS.items() if os.environ.get(name)}
+
+
+def create_mongo_client(url: str, **kwargs) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(url, connect=False, **pool_options(), **kwargs)
+
+
+async def warm_up(client, connections: int = None) -> dict:
+    """Ping the server over `connections` concurrent sockets; returns timings in ms."""
+    if connections is None:
+        connections = int(os.environ.get("MONGO_WARM_CONNECTIONS", os.environ.get("MONGO_MIN_POOL_SIZE", "4")))
+    if connections <= 0:
+        return {"connections": 0}
+    started = time.perf_counter()
+    await client.admin.command("ping")
+    first_ping = time.perf_counter()
+    if connections > 1:
+        await asyncio.gather(*(client.admin.command("ping") for _ in range(connections - 1)))
+    return {
+        "firstPingMs": round((first_ping - started) * 1000, 1),
+        "warmupMs": round((time.perf_counter() - started) * 1000, 1),
+        "connections": connections,
+    }
@@ -0,0 +1,172 @@
+"""Materialized per-user, per-day nutrition totals.
+
+`nutrition_daily` holds one document per (userId, date) with summed macros
+and a meal count. `add_meal` bumps it with `$inc` so `/nutrition` reads the
+totals with a single indexed lookup regardless of how many meals exist.
+
+Backfill or repair from `meals` with:
+
+    python nutrition.py --rebuild [--user USER_ID]
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from pymongo import UpdateOne
+
+MACROS = ("calories", "protein", "carbs", "fats")
+
+
+async def record_meal(db, meal: dict):
+    await db.nutrition_daily.update_one(
+        {"userId": meal["userId"], "date": meal["date"]},
+        {
+            "$inc": {**{field: meal.get(field, 0) for field in MACROS}, "mealCount": 1},
+            "$set": {"updatedAt": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+
+
+def daily_totals(meals) -> dict:
+    """Sum macros and meal counts per (userId, date)."""
+    totals = {}
+    for meal in meals:
+        key = (meal["userId"], meal["date"])
+        day = totals.setdefault(key, {**{field: 0 for field in MACROS}, "mealCount": 0})
+        for field in MACROS:
+            day[field] += meal.get(field, 0)
+        day["mealCount"] += 1
+    return totals
+
+
+async def record_meals(db, meals):
+    totals = daily_totals(meals)
+    if not totals:
+        return
+    await db.nutrition_daily.bulk_write([
+        UpdateOne(
+            {"userId": user_id, "date": date},
+            {"$inc": inc, "$set": {"updatedAt": datetime.utcnow()}},
+            upsert=True,
+        )
+        for (user_id, date), inc in totals.items()
+    ], ordered=False)
+
+
+async def get_daily_totals(db, user_id: str, date: str) -> tuple:
+    rollup = await db.nutrition_daily.find_one(
+        {"userId": user_id, "date": date},
+        {"_id": 0, **{field: 1 for field in MACROS}, "mealCount": 1},
+    ) or {}
+    totals = {field: rollup.get(field, 0) for field in MACROS}
+    return totals, rollup.get("mealCount", 0)
+
+
+# $group keys for each summary bucket size, over "YYYY-MM-DD" date strings.
+# Meals stored before dates were validated map to a null week and are dropped
+BUCKET_KEYS = {
+    "day": "$date",
+    "week": {"$dateToString": {
+        "format": "%G-W%V",
+        "date": {"$dateFromString": {
+            "dateString": "$date", "format": "%Y-%m-%d", "onError": None, "onNull": None,
+        }},
+        "onNull": None,
+    }},
+    "month": {"$substrCP": ["$date", 0, 7]},
+}
+
+
+def summary_pipeline(user_id: str, start: str, end: str, bucket: str) -> list:
+    return [
+        {"$match": {"userId": user_id, "date": {"$gte": start, "$lte": end}}},
+        {"$group": {
+            "_id": BUCKET_KEYS[bucket],
+            **{field: {"$sum": f"${field}"} for field in MACROS},
+            "mealCount": {"$sum": 1},
+        }},
+        {"$match": {"_id": {"$ne": None}}},
+        {"$sort": {"_id": 1}},
+        # Fold the sorted buckets into one document of parallel arrays
+        {"$group": {
+            "_id": None,
+            "buckets": {"$push": "$_id"},
+            **{field: {"$push": f"${field}"} for field in MACROS},
+            "mealCount": {"$push": "$mealCount"},
+        }},
+        {"$project": {"_id": 0}},
+    ]
+
+
+async def summarize_range(db, user_id: str, start: str, end: str, bucket: str) -> dict:
+    """Sum macros per bucket between two dates (inclusive) as columnar arrays."""
+    result = await db.meals.aggregate(summary_pipeline(user_id, start, end, bucket)).to_list(1)
+    if result:
+        return result[0]
+    return {"buckets": [], **{field: [] for field in MACROS}, "mealCount": []}
+
+
+def _rollup_cursor(db, match: dict):
+    return db.meals.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"userId": "$userId", "date": "$date"},
+            **{field: {"$sum": f"${field}"} for field in MACROS},
+            "mealCount": {"$sum": 1},
+        }},
+    ])
+
+
+async def recompute_days(db, days) -> None:
+    """Recompute the rollups of the given (userId, date) pairs from `meals`."""
+    days = set(days)
+    if not days:
+        return
+    cursor = _rollup_cursor(db, {"$or": [{"userId": user_id, "date": date} for user_id, date in days]})
+    async for doc in cursor:
+        key = doc.pop("_id")
+        days.discard((key["userId"], key["date"]))
+        await db.nutrition_daily.update_one(
+            key, {"$set": {**doc, "updatedAt": datetime.utcnow()}}, upsert=True
+        )
+    for user_id, date in days:
+        await db.nutrition_daily.delete_one({"userId": user_id, "date": date})
+
+
+async def rebuild_rollups(db, user_id: str = None) -> int:
+    match = {"userId": user_id} if user_id else {}
+    await db.nutrition_daily.delete_many(match)
+    count = 0
+    async for doc in _rollup_cursor(db, match):
+        key = doc.pop("_id")
+        await db.nutrition_daily.update_one(
+            key, {"$set": {**doc, "updatedAt": datetime.utcnow()}}, upsert=True
+        )
+        count += 1
+    return count
+
+
+async def _main(argv):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if "--rebuild" not in argv:
+        print("usage: python nutrition.py --rebuild [--user USER_ID]")
+        return 2
+    user_id = argv[argv.index("--user") + 1] if "--user" in argv else None
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        count = await rebuild_rollups(client[os.environ['DB_NAME']], user_id)
+        print(f"Rebuilt {count} daily nutrition rollup(s)")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,117 @@
+"""Opt-in sampling profiler for individual requests.
+
+A request is profiled when it carries `X-Profile: <PROFILING_ADMIN_TOKEN>`
+or is picked by `PROFILE_SAMPLE_RATE`. pyinstrument runs in async mode, so
+time spent awaiting Mongo or the LLM shows up as `[await]` under the
+handler that awaited it instead of being smeared across whatever else the
+event loop ran. Sessions are stored in `request_profiles` (TTL-expired)
+keyed by request id and rendered on fetch as text, HTML or speedscope.
+
+Streaming responses are profiled up to the point their headers are sent.
+"""
+import json
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from pyinstrument import Profiler, renderers
+from pyinstrument.session import Session
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("text", "html", "speedscope")
+
+
+class RequestProfiler:
+    def __init__(self, db, token: str = None, sample_rate: float = 0.0,
+                 interval: float = 0.001, ttl: int = 86400):
+        self.collection = db.request_profiles
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.ttl = ttl
+        self._active = 0
+
+    def trigger(self, request) -> str:
+        if self.token and request.headers.get("x-profile") == self.token:
+            return "header"
+        # Sampled profiles never stack on top of one another
+        if self.sample_rate > 0 and self._active == 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, request, call_next):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return await call_next(request)
+
+        request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        try:
+            profiler.start()
+        except RuntimeError:
+            # Another profiler already owns this context
+            return await call_next(request)
+
+        self._active += 1
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            self._active -= 1
+            session = profiler.stop()
+            await self._save(request_id, request, status, trigger, session)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Profile-Id"] = request_id
+        return response
+
+    async def _save(self, request_id: str, request, status: int, trigger: str, session):
+        route = request.scope.get("route")
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one({
+                "id": request_id,
+                "method": request.method,
+                "path": request.url.path,
+                "route": route.path if route else None,
+                "status": status,
+                "trigger": trigger,
+                "durationMs": round(session.duration * 1000, 2),
+                "cpuTimeMs": round(session.cpu_time * 1000, 2),
+                "samples": session.sample_count,
+                "session": json.dumps(session.to_json()),
+                "createdAt": now,
+                "expiresAt": now + timedelta(seconds=self.ttl),
+            })
+        except Exception as e:
+            logger.error(f"Failed to store profile {request_id}: {str(e)}")
+
+    async def list(self, limit: int = 50, route: str = None):
+        query = {"route": route} if route else {}
+        return await self.collection.find(query, {"_id": 0, "session": 0, "expiresAt": 0}) \
+            .sort("createdAt", -1).limit(limit).to_list(limit)
+
+    async def render(self, request_id: str, fmt: str = "text"):
+        """Returns (body, media_type), or None if the profile is unknown or expired."""
+        doc = await self.collection.find_one({"id": request_id}, {"_id": 0, "session": 1})
+        if not doc:
+            return None
+        session = Session.from_json(json.loads(doc["session"]))
+        if fmt == "html":
+            return renderers.HTMLRenderer().render(session), "text/html"
+        if fmt == "speedscope":
+            return renderers.SpeedscopeRenderer().render(session), "application/json"
+        return renderers.ConsoleRenderer(unicode=True, color=False).render(session), "text/plain"
+
+
+def create_request_profiler(db) -> RequestProfiler:
+    return RequestProfiler(
+        db,
+        token=os.environ.get("PROFILING_ADMIN_TOKEN") or None,
+        sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", "0")),
+        interval=float(os.environ.get("PROFILE_INTERVAL", "0.001")),
+        ttl=int(os.environ.get("PROFILE_TTL", "86400")),
+    )
@@ -0,0 +1,123 @@
+"""Read-through cache for per-user computed responses.
+
+Entries are orjson-encoded response bodies keyed by endpoint, user and a
+per-user version number. Write
+handlers bump the version instead of deleting keys, so a response computed
+while a write was landing is stored under the old version and never served
+again; stale versions simply age out through the TTL.
+
+The in-process backend is the default, but it only sees invalidations
+made in its own process: with more than one worker, a write handled by
+one worker leaves the others serving the old response until the TTL runs
+out. Multi-worker deployments must set STATS_CACHE_REDIS_URL (or
+REDIS_URL) to share entries and versions through Redis; any object with
+the same four coroutine methods can stand in.
+"""
+import logging
+import os
+
+from cachetools import LRUCache, TTLCache
+
+from fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCacheBackend:
+    def __init__(self, maxsize: int = 4096, ttl: int = 60, max_versions: int = 65536):
+        self._values = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Versions come from one process-wide clock, so a key evicted from
+        # the LRU and seen again starts at the current clock value, which is
+        # never below a version any of its cached entries were stored under
+        self._versions = LRUCache(maxsize=max_versions)
+        self._clock = 0
+
+    async def get(self, key: str):
+        return self._values.get(key)
+
+    async def set(self, key: str, value, ttl: int):
+        self._values[key] = value
+
+    async def version(self, key: str) -> int:
+        version = self._versions.get(key)
+        if version is None:
+            version = self._versions[key] = self._clock
+        return version
+
+    async def bump(self, key: str) -> int:
+        self._clock += 1
+        self._versions[key] = self._clock
+        return self._clock
+
+
+class RedisCacheBackend:
+    def __init__(self, url: str = None, client=None):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url)
+        self.redis = client
+
+    async def get(self, key: str):
+        return await self.redis.get(key)
+
+    async def set(self, key: str, value, ttl: int):
+        await self.redis.set(key, value, ex=ttl)
+
+    async def version(self, key: str) -> int:
+        raw = await self.redis.get(key)
+        return int(raw) if raw is not None else 0
+
+    async def bump(self, key: str) -> int:
+        return await self.redis.incr(key)
+
+
+class UserResponseCache:
+    def __init__(self, backend, ttl: int = 60):
+        self.backend = backend
+        self.ttl = ttl
+        self._counters = {}
+        self._invalidations = 0
+
+    async def get_or_compute(self, endpoint: str, user_id: str, compute):
+        """Return the cached encoded body, or compute, encode and store it."""
+        counters = self._counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+        version = await self.backend.version(f"ver:{user_id}")
+        key = f"resp:{endpoint}:{user_id}:{version}"
+        value = await self.backend.get(key)
+        if value is not None:
+            counters["hits"] += 1
+            return value
+
+        counters["misses"] += 1
+        value = dumps(await compute())
+        await self.backend.set(key, value, self.ttl)
+        return value
+
+    async def invalidate(self, user_id: str):
+        self._invalidations += 1
+        await self.backend.bump(f"ver:{user_id}")
+
+    def stats(self) -> dict:
+        endpoints = {}
+        for endpoint, counters in self._counters.items():
+            lookups = counters["hits"] + counters["misses"]
+            endpoints[endpoint] = {
+                **counters,
+                "hitRate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            }
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "invalidations": self._invalidations,
+            "endpoints": endpoints,
+        }
+
+
+def create_user_response_cache() -> UserResponseCache:
+    ttl = int(os.environ.get("STATS_CACHE_TTL", "60"))
+    redis_url = os.environ.get("STATS_CACHE_REDIS_URL") or os.environ.get("REDIS_URL")
+    if not redis_url and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning("Response cache is per-process with multiple workers; set STATS_CACHE_REDIS_URL")
+    backend = RedisCacheBackend(redis_url) if redis_url else LocalCacheBackend(ttl=ttl)
+    return UserResponseCache(backend, ttl=ttl)
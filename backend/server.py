@@ -1,36 +1,147 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+import time
+# Taken before the imports below so the startup report includes them
+BOOT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import AfterValidator, BaseModel, Field
+from typing import Annotated, Any, List, Literal, Optional
 import uuid
+import json
+import base64
+from contextlib import aclosing, asynccontextmanager
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from pymongo.errors import DuplicateKeyError
+from auth_pool import AuthPoolSaturated, create_auth_pool
+from indexes import ensure_indexes
+from mongo import create_mongo_client, warm_up
+from streaks import get_current_streak, recompute_streak, record_workout_day, record_workout_days
+from nutrition import get_daily_totals, recompute_days as recompute_meal_days, record_meal, record_meals, summarize_range
+from weights import recompute_months as recompute_weight_months, record_weight, record_weights, weight_series
+from export import EXPORT_COLLECTIONS, export_user_history
+from bulk import MAX_BULK_ITEMS, insert_items, summarize as summarize_bulk, validate_items
+from ai_workout import WorkoutParseError, fix_prompt, parse_workout
+from llm_cache import LLMResponseCache
+from llm_gateway import LLMGatewayError, create_llm_gateway
+from llm_clients import create_llm_client_registry
+from singleflight import MongoLease, SingleFlight
+from chat_context import ChatContextBuilder, estimate_tokens
+from response_cache import create_user_response_cache
+from fast_json import FastJSONResponse, dumps
+from metrics import (
+    HTTP_IN_FLIGHT, MongoCommandMetrics, observe_auth, observe_llm_call, observe_request, observe_workout_parse,
+    render as render_metrics, stats_collector,
+)
+from profiling import FORMATS as PROFILE_FORMATS, create_request_profiler
+from jobs import FAILED as JOB_FAILED, SUCCEEDED as JOB_SUCCEEDED, JobQueue, JobWorker
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = create_mongo_client(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+auth_pool = create_auth_pool(pwd_context, observer=observe_auth)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Readiness waits for this block; each phase lands in the startup report
+    report = {"importMs": round((time.perf_counter() - BOOT_STARTED) * 1000, 1)}
+    started = time.perf_counter()
+    try:
+        report["mongo"] = await warm_up(client)
+    except Exception as e:
+        logger.error(f"MongoDB warmup failed: {str(e)}")
+        report["mongo"] = {"error": str(e)}
+    if "error" in report["mongo"]:
+        # Every collection would wait out server selection in turn; start
+        # degraded and leave the indexes to the next start or indexes.py
+        logger.error("Skipping index creation: MongoDB is unreachable")
+        report["indexesMs"] = None
+    else:
+        phase = time.perf_counter()
+        await ensure_indexes(db)
+        report["indexesMs"] = round((time.perf_counter() - phase) * 1000, 1)
+    if job_worker.concurrency > 0:
+        job_worker.start()
+    report["lifespanMs"] = round((time.perf_counter() - started) * 1000, 1)
+    report["totalMs"] = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+    app.state.startup_report = report
+    logger.info(f"Startup completed: {report}")
+    yield
+    await job_worker.stop()
+    await llm_clients.aclose()
+    client.close()
+    auth_pool.shutdown()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Get Emergent LLM key
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
+LLM_PROVIDER = "openai"
+LLM_MODEL = "gpt-4o-mini"
+
+# Long-lived provider clients; chats are per-request sessions on top of them
+llm_clients = create_llm_client_registry(EMERGENT_LLM_KEY)
+
+def new_llm_chat(session_id: str, system_message: str):
+    return llm_clients.chat(LLM_PROVIDER, LLM_MODEL, session_id, system_message)
+
+def new_user_message(text: str):
+    return llm_clients.user_message(text)
+
+def chat_streaming_supported() -> bool:
+    return llm_clients.supports_streaming
+
+STREAMING_UNSUPPORTED = "Streaming needs an OpenAI-compatible LLM endpoint (LLM_BASE_URL); use /api/ai/chat"
+
+# All outbound LLM calls share one gateway
+llm_gateway = create_llm_gateway()
+
+# Cache for generated workout plans
+workout_cache = LLMResponseCache(
+    db,
+    namespace="workout",
+    maxsize=int(os.environ.get('LLM_CACHE_SIZE', '512')),
+    ttl=int(os.environ.get('LLM_CACHE_TTL', '86400')),
+    persistent=os.environ.get('LLM_CACHE_PERSISTENT', '').lower() in ('1', 'true', 'yes'),
+)
+
+# Identical in-flight generations share one LLM call. Coalescing across
+# workers hands results over through the persistent cache tier. A leader
+# may spend a full gateway timeout on the generation and another on the
+# fix-this-JSON call, so the lease outlives both; followers wait for about
+# one generation before producing the plan themselves.
+workout_singleflight = SingleFlight(
+    lease=MongoLease(db, ttl=2 * llm_gateway.timeout + 10) if workout_cache.persistent
+    and os.environ.get('LLM_SINGLEFLIGHT_LEASE', '').lower() in ('1', 'true', 'yes') else None,
+    wait_timeout=llm_gateway.timeout,
+)
+
+# Read-through cache for per-user stats, progress and dashboard responses
+user_cache = create_user_response_cache()
+
+# Opt-in per-request profiles, fetched through the admin routes
+request_profiler = create_request_profiler(db)
+
+# Queue for AI work that runs outside the request
+job_queue = JobQueue(db, max_attempts=int(os.environ.get('AI_JOB_MAX_ATTEMPTS', '3')))
+AI_JOB_EVENTS_TIMEOUT = float(os.environ.get('AI_JOB_EVENTS_TIMEOUT', '300'))
 
 # ====================
 # Models
@@ -60,6 +171,13 @@ class Exercise(BaseModel):
     reps: str
     description: Optional[str] = None
 
+def check_calendar_date(value: str) -> str:
+    # The pattern lets 2024-02-30 through; rollups and series parse these
+    datetime.strptime(value, "%Y-%m-%d")
+    return value
+
+CalendarDate = Annotated[str, Field(pattern=r"^\d{4}-\d{2}-\d{2}$"), AfterValidator(check_calendar_date)]
+
 class Meal(BaseModel):
     userId: str
     name: str
@@ -67,13 +185,32 @@ class Meal(BaseModel):
     protein: float
     carbs: float
     fats: float
-    date: str
+    date: CalendarDate
     time: str = Field(default_factory=lambda: datetime.now().strftime("%H:%M"))
 
 class WeightEntry(BaseModel):
     userId: str
     weight: float
-    date: str
+    date: CalendarDate
+
+class WorkoutLog(BaseModel):
+    userId: str
+    date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    workoutId: Optional[str] = None
+    completed: bool = True
+
+class BulkMeal(Meal):
+    idempotencyKey: Optional[str] = None
+
+class BulkWeightEntry(WeightEntry):
+    idempotencyKey: Optional[str] = None
+
+class BulkWorkoutLog(WorkoutLog):
+    idempotencyKey: Optional[str] = None
+
+class BulkRequest(BaseModel):
+    # Items are validated one by one so a malformed row cannot reject the batch
+    items: List[Any]
 
 class ChatMessage(BaseModel):
     userId: str
@@ -82,6 +219,8 @@ class ChatMessage(BaseModel):
 class AIWorkoutRequest(BaseModel):
     userId: str
     prompt: str
+    noCache: bool = False
+    mode: Literal["sync", "async"] = "sync"
 
 # ====================
 # Auth Routes
@@ -94,8 +233,11 @@ async def signup(user: UserSignup):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Hash password
-    hashed_password = pwd_context.hash(user.password)
+    # Hash password off the event loop
+    try:
+        hashed_password = await auth_pool.hash(user.password)
+    except AuthPoolSaturated:
+        raise HTTPException(status_code=503, detail="Auth service busy, please retry")
     
     # Create user
     user_id = str(uuid.uuid4())
@@ -107,7 +249,11 @@ async def signup(user: UserSignup):
         "createdAt": datetime.utcnow()
     }
     
-    await db.users.insert_one(user_data)
+    try:
+        await db.users.insert_one(user_data)
+    except DuplicateKeyError:
+        # A concurrent signup for the same email won the race past the check above
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     return {
         "success": True,
@@ -122,7 +268,15 @@ async def signup(user: UserSignup):
 async def login(user: UserLogin):
     # Find user
     db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not pwd_context.verify(user.password, db_user["password"]):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    # Verify password off the event loop
+    try:
+        valid = await auth_pool.verify(user.password, db_user["password"])
+    except AuthPoolSaturated:
+        raise HTTPException(status_code=503, detail="Auth service busy, please retry")
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     return {
@@ -134,12 +288,29 @@ async def login(user: UserLogin):
         }
     }
 
+@api_router.get("/auth/pool-stats")
+async def auth_pool_stats():
+    return {
+        "success": True,
+        "stats": auth_pool.stats()
+    }
+
 # ====================
 # User Stats Routes
 # ====================
 
+@api_router.get("/users/cache-stats")
+async def user_cache_stats():
+    return {
+        "success": True,
+        "stats": user_cache.stats()
+    }
+
 @api_router.get("/users/{user_id}/stats")
 async def get_user_stats(user_id: str):
+    return FastJSONResponse(await user_cache.get_or_compute("stats", user_id, lambda: build_user_stats(user_id)))
+
+async def build_user_stats(user_id: str):
     # Calculate stats
     today = datetime.now()
     week_ago = today - timedelta(days=7)
@@ -170,23 +341,88 @@ async def get_user_stats(user_id: str):
     }
 
 async def calculate_streak(user_id: str):
-    # Simple streak calculation
-    logs = await db.workout_logs.find({"userId": user_id}).sort("date", -1).to_list(100)
-    if not logs:
-        return 0
-    
-    streak = 0
-    current_date = datetime.now().date()
-    
-    for log in logs:
-        log_date = datetime.strptime(log["date"], "%Y-%m-%d").date()
-        if log_date == current_date or log_date == current_date - timedelta(days=1):
-            streak += 1
-            current_date = log_date - timedelta(days=1)
-        else:
-            break
+    # Streak state is maintained incrementally on workout-log writes
+    return await get_current_streak(db, user_id)
+
+async def timed_section(timings: dict, name: str, awaitable):
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+@api_router.get("/users/{user_id}/dashboard")
+async def get_dashboard(user_id: str):
+    return FastJSONResponse(await user_cache.get_or_compute("dashboard", user_id, lambda: build_dashboard(user_id)))
+
+async def build_dashboard(user_id: str):
+    started = time.perf_counter()
+    today = datetime.now()
+    week_ago = today - timedelta(days=7)
+    timings = {}
+    
+    # Every sub-query runs once, all of them concurrently
+    workouts_this_week, total_workouts, streak, (consumed, meal_count), latest_weight, recent_plans = await asyncio.gather(
+        timed_section(timings, "workoutsThisWeek", db.workout_logs.count_documents({
+            "userId": user_id,
+            "date": {"$gte": week_ago.strftime("%Y-%m-%d")}
+        })),
+        timed_section(timings, "totalWorkouts", db.workout_logs.count_documents({"userId": user_id})),
+        timed_section(timings, "streak", calculate_streak(user_id)),
+        timed_section(timings, "nutrition", get_daily_totals(db, user_id, today.strftime("%Y-%m-%d"))),
+        timed_section(timings, "latestWeight", db.weight_entries.find_one(
+            {"userId": user_id}, {"_id": 0}, sort=[("date", -1)]
+        )),
+        timed_section(timings, "recentPlans", db.workout_plans.find(
+            {"userId": user_id}, {"_id": 0}
+        ).sort("createdAt", -1).limit(5).to_list(5)),
+    )
     
-    return streak
+    return {
+        "success": True,
+        "stats": {
+            "workoutsThisWeek": workouts_this_week,
+            "caloriesBurned": workouts_this_week * 350,  # Assume 350 cal per workout
+            "activeMinutes": workouts_this_week * 45,  # Assume 45 min per workout
+            "currentStreak": streak
+        },
+        "progress": {
+            "totalWorkouts": total_workouts,
+            "totalCaloriesBurned": total_workouts * 350,  # Mock calculation
+            "avgWorkoutDuration": 45  # Mock
+        },
+        "nutrition": {
+            "date": today.strftime("%Y-%m-%d"),
+            "consumed": consumed,
+            "mealCount": meal_count
+        },
+        "latestWeight": latest_weight,
+        "recentPlans": recent_plans,
+        "timings": {
+            **timings,
+            "totalMs": round((time.perf_counter() - started) * 1000, 2)
+        }
+    }
+
+@api_router.get("/users/{user_id}/export")
+async def export_user_data(user_id: str, compress: bool = False, collections: Optional[str] = None):
+    selected = EXPORT_COLLECTIONS
+    if collections:
+        selected = tuple(name.strip() for name in collections.split(","))
+        unknown = set(selected) - set(EXPORT_COLLECTIONS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(sorted(unknown))}")
+    
+    filename = f"fitgenius-{user_id}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        export_user_history(
+            db, user_id, selected,
+            batch_size=int(os.environ.get('EXPORT_BATCH_SIZE', '500')),
+            compress=compress
+        ),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # ====================
 # Workout Routes
@@ -195,7 +431,7 @@ async def calculate_streak(user_id: str):
 @api_router.get("/workouts")
 async def get_workouts(userId: str):
     # Get workout plans
-    workout_plans = await db.workout_plans.find({"userId": userId}).to_list(100)
+    workout_plans = await db.workout_plans.find({"userId": userId}, {"_id": 0}).to_list(100)
     
     # Get exercise library
     exercises = [
@@ -209,24 +445,32 @@ async def get_workouts(userId: str):
         {"id": "8", "name": "Yoga Flow", "category": "Flexibility", "sets": 1, "reps": "20 min"},
     ]
     
-    return {
+    return FastJSONResponse({
         "success": True,
         "workoutPlans": workout_plans,
         "exercises": exercises
-    }
+    })
 
 # ====================
 # AI Workout Generation
 # ====================
 
-@api_router.post("/ai/generate-workout")
-async def generate_ai_workout(request: AIWorkoutRequest):
+async def call_llm(kind: str, chat, user_message):
+    # Every non-streaming LLM call: gateway admission plus latency/token metrics
+    started = time.perf_counter()
     try:
-        # Initialize AI chat
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"workout_{request.userId}_{datetime.now().timestamp()}",
-            system_message="""You are an expert fitness coach. Create personalized workout plans based on user requirements. 
+        response = await llm_gateway.call(lambda: chat.send_message(user_message))
+    except Exception as e:
+        outcome = "rejected" if isinstance(e, LLMGatewayError) else "error"
+        observe_llm_call(kind, outcome, time.perf_counter() - started)
+        raise
+    observe_llm_call(
+        kind, "success", time.perf_counter() - started,
+        prompt_tokens=estimate_tokens(user_message.text), completion_tokens=estimate_tokens(response)
+    )
+    return response
+
+WORKOUT_SYSTEM_MESSAGE = """You are an expert fitness coach. Create personalized workout plans based on user requirements. 
             Return ONLY a JSON object with this exact structure:
             {
                 "name": "Workout Plan Name",
@@ -236,82 +480,228 @@ async def generate_ai_workout(request: AIWorkoutRequest):
                     {"name": "Exercise name", "sets": 3, "reps": "12-15", "rest": "60s"}
                 ]
             }"""
-        ).with_model("openai", "gpt-4o-mini")
-        
-        user_message = UserMessage(
-            text=f"Create a workout plan based on: {request.prompt}. Return ONLY valid JSON, no markdown or extra text."
-        )
-        
-        response = await chat.send_message(user_message)
-        
-        # Parse AI response
-        import json
-        # Clean response - remove markdown code blocks if present
-        clean_response = response.strip()
-        if clean_response.startswith("```"):
-            clean_response = clean_response.split("```")[1]
-            if clean_response.startswith("json"):
-                clean_response = clean_response[4:]
-            clean_response = clean_response.strip()
-        
-        workout_data = json.loads(clean_response)
-        
-        # Save to database
-        workout_plan = {
-            "id": str(uuid.uuid4()),
-            "userId": request.userId,
-            "name": workout_data.get("name", "AI Generated Workout"),
-            "description": workout_data.get("description", "Custom workout plan"),
-            "duration": workout_data.get("duration", 45),
-            "exercises": workout_data.get("exercises", []),
-            "createdAt": datetime.utcnow()
-        }
-        
-        await db.workout_plans.insert_one(workout_plan)
+
+async def request_ai_workout(request: AIWorkoutRequest):
+    # Initialize AI chat
+    chat = new_llm_chat(f"workout_{request.userId}_{datetime.now().timestamp()}", WORKOUT_SYSTEM_MESSAGE)
+    
+    user_message = new_user_message(
+        f"Create a workout plan based on: {request.prompt}. Return ONLY valid JSON, no markdown or extra text."
+    )
+    
+    response = await call_llm("workout", chat, user_message)
+    
+    # Repair locally first; only a reply that cannot be salvaged costs a
+    # second, short call instead of a whole new generation
+    try:
+        workout, fixes = parse_workout(response)
+        observe_workout_parse("repaired" if fixes else "valid", fixes)
+    except WorkoutParseError as e:
+        fix_chat = new_llm_chat(f"workout_fix_{request.userId}_{datetime.now().timestamp()}", WORKOUT_SYSTEM_MESSAGE)
+        fixed = await call_llm("workout_fix", fix_chat, new_user_message(fix_prompt(response, e)))
+        try:
+            workout, _ = parse_workout(fixed)
+        except WorkoutParseError:
+            observe_workout_parse("failed")
+            raise
+        observe_workout_parse("llm_fixed")
+    
+    return workout.model_dump()
+
+async def create_ai_workout(request: AIWorkoutRequest):
+    # Near-identical prompts share one cached generation
+    cache_key = workout_cache.key(request.prompt, WORKOUT_SYSTEM_MESSAGE, LLM_MODEL)
+    workout_data = None
+    if request.noCache:
+        workout_cache.record_bypass()
+    else:
+        workout_data = await workout_cache.get(cache_key)
+    cached = workout_data is not None
+    
+    if not cached:
+        async def produce():
+            data = await request_ai_workout(request)
+            await workout_cache.set(cache_key, data)
+            return data
         
-        # Log the workout completion
-        await db.workout_logs.insert_one({
-            "userId": request.userId,
-            "workoutId": workout_plan["id"],
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "completed": False
+        if request.noCache:
+            workout_data = await produce()
+        else:
+            workout_data = await workout_singleflight.do(
+                cache_key, produce, lambda: workout_cache.get(cache_key, record=False)
+            )
+    
+    # Save to database
+    workout_plan = {
+        "id": str(uuid.uuid4()),
+        "userId": request.userId,
+        "name": workout_data.get("name", "AI Generated Workout"),
+        "description": workout_data.get("description", "Custom workout plan"),
+        "duration": workout_data.get("duration", 45),
+        "exercises": workout_data.get("exercises", []),
+        "createdAt": datetime.utcnow()
+    }
+    
+    # Insert a copy so the driver's _id never leaks into the response
+    await db.workout_plans.insert_one({**workout_plan})
+    
+    # Log the workout completion
+    log_date = datetime.now().strftime("%Y-%m-%d")
+    await db.workout_logs.insert_one({
+        "userId": request.userId,
+        "workoutId": workout_plan["id"],
+        "date": log_date,
+        "completed": False
+    })
+    await record_workout_day(db, request.userId, log_date)
+    await user_cache.invalidate(request.userId)
+    
+    return workout_plan, cached
+
+@api_router.post("/ai/generate-workout")
+async def generate_ai_workout(request: AIWorkoutRequest):
+    if request.mode == "async":
+        # Hand the generation to the job workers and return immediately
+        job = await job_queue.enqueue("generate_workout", request.dict(), request.userId)
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "jobId": job["id"],
+            "status": job["status"]
         })
-        
-        # Remove MongoDB _id field for JSON serialization
-        workout_plan.pop('_id', None)
+    
+    try:
+        workout_plan, cached = await create_ai_workout(request)
         
         return {
             "success": True,
-            "workout": workout_plan
+            "workout": workout_plan,
+            "cached": cached
         }
         
+    except LLMGatewayError as e:
+        logging.warning(f"LLM gateway rejected workout generation: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except WorkoutParseError as e:
+        logging.error(f"Unusable workout from LLM: {str(e)}")
+        raise HTTPException(status_code=502, detail="AI returned an invalid workout plan, please retry")
     except Exception as e:
         logging.error(f"Error generating workout: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate workout: {str(e)}")
 
+async def run_workout_job(payload: dict):
+    workout_plan, cached = await create_ai_workout(AIWorkoutRequest(**{**payload, "mode": "sync"}))
+    return {"workout": workout_plan, "cached": cached}
+
+job_handlers = {"generate_workout": run_workout_job}
+
+@api_router.get("/ai/jobs/{job_id}")
+async def get_ai_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "success": True,
+        "job": job
+    }
+
+@api_router.get("/ai/jobs/{job_id}/events")
+async def ai_job_events(job_id: str, request: Request):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        # Clients that outlive the deadline reconnect or poll /ai/jobs/{id}
+        deadline = time.monotonic() + AI_JOB_EVENTS_TIMEOUT
+        current = job
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield sse_event("status", current)
+            if current["status"] in (JOB_SUCCEEDED, JOB_FAILED):
+                return
+            if time.monotonic() >= deadline:
+                yield sse_event("timeout", {"id": job_id, "status": current["status"]})
+                return
+            await asyncio.sleep(1)
+            if await request.is_disconnected():
+                return
+            current = await job_queue.get(job_id)
+            if current is None:
+                return
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ====================
 # Nutrition Routes
 # ====================
 
 @api_router.get("/nutrition")
-async def get_nutrition(userId: str, date: str):
-    # Get meals for the date
-    meals = await db.meals.find({"userId": userId, "date": date}).to_list(100)
-    
-    # Calculate consumed totals
-    consumed = {
-        "calories": sum(meal.get("calories", 0) for meal in meals),
-        "protein": sum(meal.get("protein", 0) for meal in meals),
-        "carbs": sum(meal.get("carbs", 0) for meal in meals),
-        "fats": sum(meal.get("fats", 0) for meal in meals),
-    }
+async def get_nutrition(userId: str, date: str, limit: int = 50):
+    # Totals come from the daily rollup; meals are only the first page
+    consumed, meal_count = await get_daily_totals(db, userId, date)
+    meals = await list_meals(userId, date, *meal_page(0, limit))
     
-    return {
+    return FastJSONResponse({
         "success": True,
         "meals": meals,
+        "mealCount": meal_count,
         "consumed": consumed
+    })
+
+@api_router.get("/nutrition/meals")
+async def get_meals(userId: str, date: str, offset: int = 0, limit: int = 50):
+    # hasMore and the echoed offset must describe the page actually served
+    offset, limit = meal_page(offset, limit)
+    meals = await list_meals(userId, date, offset, limit)
+    return FastJSONResponse({
+        "success": True,
+        "meals": meals,
+        "offset": offset,
+        "hasMore": len(meals) == limit
+    })
+
+@api_router.get("/nutrition/summary")
+async def get_nutrition_summary(
+    userId: str,
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to"),
+    bucket: Literal["day", "week", "month"] = "day",
+):
+    try:
+        start_date = datetime.strptime(start, "%Y-%m-%d")
+        end_date = datetime.strptime(end, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be YYYY-MM-DD dates")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    
+    summary = await summarize_range(db, userId, start, end, bucket)
+    
+    return {
+        "success": True,
+        "from": start,
+        "to": end,
+        "bucket": bucket,
+        "summary": summary
     }
 
+MAX_MEALS_PAGE = 200
+
+def meal_page(offset: int, limit: int):
+    return max(offset, 0), max(1, min(limit, MAX_MEALS_PAGE))
+
+async def list_meals(user_id: str, date: str, offset: int, limit: int):
+    # offset and limit come clamped through meal_page
+    return await db.meals.find(
+        {"userId": user_id, "date": date}, {"_id": 0}
+    ).sort("createdAt", 1).skip(offset).limit(limit).to_list(limit)
+
 @api_router.post("/nutrition/add-meal")
 async def add_meal(meal: Meal):
     meal_data = {
@@ -320,10 +710,9 @@ async def add_meal(meal: Meal):
         "createdAt": datetime.utcnow()
     }
     
-    await db.meals.insert_one(meal_data)
-    
-    # Remove MongoDB _id field for JSON serialization
-    meal_data.pop('_id', None)
+    await db.meals.insert_one({**meal_data})
+    await record_meal(db, meal_data)
+    await user_cache.invalidate(meal.userId)
     
     return {
         "success": True,
@@ -336,11 +725,16 @@ async def add_meal(meal: Meal):
 
 @api_router.get("/progress")
 async def get_progress(userId: str):
+    return FastJSONResponse(await user_cache.get_or_compute("progress", userId, lambda: build_progress(userId)))
+
+async def build_progress(userId: str):
     # Get weight data
-    weight_data = await db.weight_entries.find({"userId": userId}).sort("date", 1).to_list(100)
+    # Most recent 100 weigh-ins, oldest first; full history is on /progress/weight
+    weight_data = await db.weight_entries.find({"userId": userId}, {"_id": 0}).sort("date", -1).to_list(100)
+    weight_data.reverse()
     
     # Get measurements
-    measurements = await db.measurements.find_one({"userId": userId})
+    measurements = await db.measurements.find_one({"userId": userId}, {"_id": 0})
     
     # Calculate overall stats
     total_workouts = await db.workout_logs.count_documents({"userId": userId})
@@ -360,6 +754,32 @@ async def get_progress(userId: str):
         }
     }
 
+@api_router.get("/progress/weight")
+async def get_weight_series(
+    userId: str,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    points: int = 200,
+):
+    end = end or datetime.now().strftime("%Y-%m-%d")
+    try:
+        end_date = datetime.strptime(end, "%Y-%m-%d")
+        start = start or (end_date - timedelta(days=365)).strftime("%Y-%m-%d")
+        start_date = datetime.strptime(start, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be YYYY-MM-DD dates")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    
+    series = await weight_series(db, userId, start, end, max(3, min(points, 2000)))
+    
+    return FastJSONResponse({
+        "success": True,
+        "from": start,
+        "to": end,
+        "series": series
+    })
+
 @api_router.post("/progress/add-weight")
 async def add_weight(entry: WeightEntry):
     weight_data = {
@@ -368,10 +788,9 @@ async def add_weight(entry: WeightEntry):
         "createdAt": datetime.utcnow()
     }
     
-    await db.weight_entries.insert_one(weight_data)
-    
-    # Remove MongoDB _id field for JSON serialization
-    weight_data.pop('_id', None)
+    await db.weight_entries.insert_one({**weight_data})
+    await record_weight(db, weight_data)
+    await user_cache.invalidate(entry.userId)
     
     return {
         "success": True,
@@ -382,57 +801,272 @@ async def add_weight(entry: WeightEntry):
 # AI Chat Routes
 # ====================
 
-@api_router.get("/ai/chat-history")
-async def get_chat_history(userId: str):
-    messages = await db.chat_messages.find({"userId": userId}).sort("timestamp", 1).limit(50).to_list(50)
+@api_router.get("/ai/cache-stats")
+async def ai_cache_stats():
+    return {
+        "success": True,
+        "stats": workout_cache.stats(),
+        "singleFlight": workout_singleflight.stats()
+    }
+
+@api_router.get("/ai/gateway-stats")
+async def ai_gateway_stats():
     return {
         "success": True,
-        "messages": messages
+        "stats": llm_gateway.stats(),
+        "clients": llm_clients.stats()
     }
 
+CHAT_HISTORY_PROJECTION = {"_id": 0, "id": 1, "text": 1, "isUser": 1, "timestamp": 1}
+
+def encode_chat_cursor(message: dict) -> str:
+    raw = json.dumps({"t": message["timestamp"].isoformat(), "id": message["id"]})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_chat_cursor(cursor: str):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(raw["t"]), raw["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/ai/chat-history")
+async def get_chat_history(userId: str, limit: int = 50, before: Optional[str] = None):
+    limit = max(1, min(limit, 200))
+    query = {"userId": userId}
+    if before:
+        # Keyset on (timestamp, id): strictly older than the cursor message
+        timestamp, message_id = decode_chat_cursor(before)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": message_id}},
+        ]
+    
+    # Newest first so the latest page is an index range scan; one extra row tells us if there is more
+    page = await db.chat_messages.find(query, CHAT_HISTORY_PROJECTION).sort(
+        [("timestamp", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    has_more = len(page) > limit
+    messages = list(reversed(page[:limit]))
+    
+    return FastJSONResponse({
+        "success": True,
+        "messages": messages,
+        "hasMore": has_more,
+        "nextCursor": encode_chat_cursor(messages[0]) if has_more else None
+    })
+
+COACH_SYSTEM_MESSAGE = """You are an expert AI fitness coach. Provide helpful, motivating, and accurate fitness and nutrition advice. 
+            Be friendly, supportive, and encouraging. Keep responses concise but informative."""
+
+SUMMARY_SYSTEM_MESSAGE = """You maintain a running summary of a fitness coaching conversation. 
+            Merge the new messages into the existing summary, keeping goals, constraints, injuries, 
+            preferences and progress. Reply with the updated summary only, in under 150 words."""
+
+def create_coach_chat(user_id: str, context: str = ""):
+    # Conversation history travels in the system message, bounded by chat_context
+    system_message = f"{COACH_SYSTEM_MESSAGE}\n\n{context}" if context else COACH_SYSTEM_MESSAGE
+    return new_llm_chat(f"chat_{user_id}", system_message)
+
+async def summarize_chat(previous_summary: str, transcript: str):
+    chat = new_llm_chat(f"chat_summary_{uuid.uuid4()}", SUMMARY_SYSTEM_MESSAGE)
+    user_message = new_user_message(
+        f"Existing summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
+    )
+    return await call_llm("chat_summary", chat, user_message)
+
+chat_context = ChatContextBuilder(
+    db,
+    summarize_chat,
+    max_turns=int(os.environ.get('CHAT_CONTEXT_TURNS', '12')),
+    token_budget=int(os.environ.get('CHAT_CONTEXT_TOKENS', '1500')),
+    summarize_after=int(os.environ.get('CHAT_SUMMARY_AFTER', '10')),
+)
+
+async def save_chat_message(user_id: str, text: str, is_user: bool):
+    await db.chat_messages.insert_one({
+        "id": str(uuid.uuid4()),
+        "userId": user_id,
+        "text": text,
+        "isUser": is_user,
+        "timestamp": datetime.utcnow()
+    })
+
+async def stream_coach_reply(chat, user_message):
+    async for chunk in chat.stream_message(user_message):
+        if chunk:
+            yield chunk
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
 @api_router.post("/ai/chat")
 async def ai_chat(chat_msg: ChatMessage):
     try:
+        # Recent turns plus rolling summary, built before this message is stored
+        context, oldest = await chat_context.build(chat_msg.userId)
+        
         # Save user message
-        user_msg_data = {
-            "id": str(uuid.uuid4()),
-            "userId": chat_msg.userId,
-            "text": chat_msg.message,
-            "isUser": True,
-            "timestamp": datetime.utcnow()
-        }
-        await db.chat_messages.insert_one(user_msg_data)
+        await save_chat_message(chat_msg.userId, chat_msg.message, True)
         
         # Initialize AI chat
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"chat_{chat_msg.userId}",
-            system_message="""You are an expert AI fitness coach. Provide helpful, motivating, and accurate fitness and nutrition advice. 
-            Be friendly, supportive, and encouraging. Keep responses concise but informative."""
-        ).with_model("openai", "gpt-4o-mini")
+        chat = create_coach_chat(chat_msg.userId, context)
         
-        user_message = UserMessage(text=chat_msg.message)
-        response = await chat.send_message(user_message)
+        user_message = new_user_message(chat_msg.message)
+        response = await call_llm("chat", chat, user_message)
         
         # Save AI response
-        ai_msg_data = {
-            "id": str(uuid.uuid4()),
-            "userId": chat_msg.userId,
-            "text": response,
-            "isUser": False,
-            "timestamp": datetime.utcnow()
-        }
-        await db.chat_messages.insert_one(ai_msg_data)
+        await save_chat_message(chat_msg.userId, response, False)
+        chat_context.schedule_refresh(chat_msg.userId, oldest)
         
         return {
             "success": True,
             "response": response
         }
         
+    except LLMGatewayError as e:
+        logging.warning(f"LLM gateway rejected AI chat: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         logging.error(f"Error in AI chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get AI response: {str(e)}")
 
+@api_router.post("/ai/chat/stream")
+async def ai_chat_stream(chat_msg: ChatMessage, request: Request):
+    # LlmChat has no token stream; sending the whole reply as one "token"
+    # would only add SSE overhead, so point clients at /ai/chat instead.
+    # Decided before any database work: without LLM_BASE_URL that is every call
+    if not chat_streaming_supported():
+        raise HTTPException(status_code=501, detail=STREAMING_UNSUPPORTED)
+    context, oldest = await chat_context.build(chat_msg.userId)
+    chat = create_coach_chat(chat_msg.userId, context)
+    # Chats injected in place of the registry's (the load harness) may not stream
+    if not hasattr(chat, "stream_message"):
+        raise HTTPException(status_code=501, detail=STREAMING_UNSUPPORTED)
+    await save_chat_message(chat_msg.userId, chat_msg.message, True)
+    
+    async def events():
+        parts = []
+        started = time.perf_counter()
+        # Flush headers and a first event right away so the client can render
+        yield sse_event("start", {"userId": chat_msg.userId})
+        try:
+            # The stream holds its gateway slot until the last token, within
+            # the gateway timeout; aclosing stops the upstream generation as
+            # soon as we bail out
+            user_message = new_user_message(chat_msg.message)
+            tokens = llm_gateway.stream(lambda: stream_coach_reply(chat, user_message))
+            async with aclosing(tokens):
+                async for token in tokens:
+                    if await request.is_disconnected():
+                        logging.info(f"AI chat stream for {chat_msg.userId} cancelled by client")
+                        return
+                    parts.append(token)
+                    yield sse_event("token", {"text": token})
+        except asyncio.CancelledError:
+            logging.info(f"AI chat stream for {chat_msg.userId} cancelled by client")
+            raise
+        except Exception as e:
+            logging.error(f"Error in AI chat stream: {str(e)}")
+            outcome = "rejected" if isinstance(e, LLMGatewayError) else "error"
+            observe_llm_call("chat_stream", outcome, time.perf_counter() - started)
+            yield sse_event("error", {"detail": f"Failed to get AI response: {str(e)}"})
+            return
+        
+        # Persist the assembled reply only once the stream has completed
+        response = "".join(parts)
+        observe_llm_call(
+            "chat_stream", "success", time.perf_counter() - started,
+            prompt_tokens=estimate_tokens(chat_msg.message), completion_tokens=estimate_tokens(response)
+        )
+        await save_chat_message(chat_msg.userId, response, False)
+        chat_context.schedule_refresh(chat_msg.userId, oldest)
+        yield sse_event("done", {"response": response})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ====================
+# Bulk Ingestion Routes
+# ====================
+
+async def ingest_bulk(items: List[Any], model, collection):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    valid, results = validate_items(items, model)
+    written, duplicates = await insert_items(collection, valid, results)
+    return written, duplicates, results
+
+@api_router.post("/nutrition/add-meals")
+async def add_meals(batch: BulkRequest):
+    written, duplicates, results = await ingest_bulk(batch.items, BulkMeal, db.meals)
+    await record_meals(db, written)
+    # A duplicate may be the retry of a request whose rollup never landed;
+    # recomputing its day is exact either way
+    await recompute_meal_days(db, {(meal["userId"], meal["date"]) for meal in duplicates})
+    for user_id in {meal["userId"] for meal in written + duplicates}:
+        await user_cache.invalidate(user_id)
+    return summarize_bulk(results, len(batch.items))
+
+@api_router.post("/progress/add-weights")
+async def add_weights(batch: BulkRequest):
+    written, duplicates, results = await ingest_bulk(batch.items, BulkWeightEntry, db.weight_entries)
+    await record_weights(db, written)
+    await recompute_weight_months(db, {(entry["userId"], entry["date"][:7]) for entry in duplicates})
+    for user_id in {entry["userId"] for entry in written + duplicates}:
+        await user_cache.invalidate(user_id)
+    return summarize_bulk(results, len(batch.items))
+
+@api_router.post("/workouts/add-logs")
+async def add_workout_logs(batch: BulkRequest):
+    written, duplicates, results = await ingest_bulk(batch.items, BulkWorkoutLog, db.workout_logs)
+    retried_users = {log["userId"] for log in duplicates}
+    dates_by_user = {}
+    for log in written:
+        dates_by_user.setdefault(log["userId"], []).append(log["date"])
+    for user_id, dates in dates_by_user.items():
+        if user_id not in retried_users:
+            await record_workout_days(db, user_id, dates)
+    # The full recompute also covers days whose streak update never landed
+    for user_id in retried_users:
+        await recompute_streak(db, user_id)
+    for user_id in {log["userId"] for log in written + duplicates}:
+        await user_cache.invalidate(user_id)
+    return summarize_bulk(results, len(batch.items))
+
+# ====================
+# Admin Routes
+# ====================
+
+def require_admin(request: Request):
+    token = request_profiler.token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if request.headers.get("x-admin-token") != token:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@api_router.get("/admin/profiles")
+async def list_profiles(request: Request, route: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    require_admin(request)
+    return {
+        "success": True,
+        "profiles": await request_profiler.list(limit, route)
+    }
+
+@api_router.get("/admin/profiles/{request_id}")
+async def get_profile(request: Request, request_id: str, format: str = "text"):
+    require_admin(request)
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(PROFILE_FORMATS)}")
+    rendered = await request_profiler.render(request_id, format)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    body, media_type = rendered
+    return Response(content=body, media_type=media_type)
+
 # ====================
 # Health Check
 # ====================
@@ -445,6 +1079,13 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "FitGenius API"}
 
+@api_router.get("/health/startup")
+async def startup_report(request: Request):
+    return {
+        "success": True,
+        "startup": getattr(request.app.state, "startup_report", None)
+    }
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -456,6 +1097,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.middleware("http")(request_profiler)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        observe_request(
+            request.method, route.path if route else "unmatched", status, time.perf_counter() - started
+        )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+stats_collector.add("auth_pool", auth_pool.stats, counters=["submitted", "rejected", "completed"])
+stats_collector.add("llm_gateway", llm_gateway.stats, counters=[
+    "calls", "succeeded", "failed", "retries", "timeouts",
+    "rejectedQueueFull", "rejectedCircuitOpen", "circuitOpened",
+])
+stats_collector.add("llm_cache", workout_cache.stats, counters=["localHits", "persistentHits", "misses", "bypassed"])
+stats_collector.add("llm_singleflight", workout_singleflight.stats, counters=["leaders", "coalesced", "leaseWaits", "leaseHits", "leaseTimeouts"])
+for endpoint in ("stats", "progress", "dashboard"):
+    stats_collector.add(
+        "user_cache",
+        lambda endpoint=endpoint: user_cache.stats()["endpoints"].get(endpoint, {}),
+        counters=["hits", "misses"],
+        labels={"endpoint": endpoint},
+    )
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -463,6 +1143,4 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+job_worker = JobWorker(job_queue, job_handlers, concurrency=int(os.environ.get('AI_JOB_WORKERS', '2')))
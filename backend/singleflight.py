@@ -0,0 +1,96 @@
+"""Single-flight deduplication of identical in-flight work.
+
+Concurrent callers with the same key share one task instead of each doing
+the work. Within a worker that is an in-memory map of running tasks; across
+uvicorn workers an optional Mongo lease (`llm_leases`) elects one leader
+while the others poll for the leader's result. The lease TTL must cover the
+leader's worst case; followers give up after `wait_timeout` and do the work
+themselves rather than wait on a leader that may be stuck.
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+
+class MongoLease:
+    def __init__(self, db, ttl: float = 90.0):
+        self.db = db
+        self.ttl = ttl
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self, key: str) -> bool:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        try:
+            await self.db.llm_leases.insert_one({"_id": key, "owner": self.owner, "expiresAt": expires_at})
+            return True
+        except DuplicateKeyError:
+            # Take over a lease whose holder died without releasing it
+            result = await self.db.llm_leases.update_one(
+                {"_id": key, "expiresAt": {"$lt": now}},
+                {"$set": {"owner": self.owner, "expiresAt": expires_at}},
+            )
+            return result.modified_count == 1
+
+    async def release(self, key: str):
+        await self.db.llm_leases.delete_one({"_id": key, "owner": self.owner})
+
+
+class SingleFlight:
+    def __init__(self, lease: MongoLease = None, poll_interval: float = 0.5, wait_timeout: float = 60.0):
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self._inflight = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "leaseWaits": 0, "leaseHits": 0, "leaseTimeouts": 0}
+
+    async def do(self, key: str, fn, lookup=None):
+        """Run `fn()` once per key; `lookup()` fetches a result another worker produced."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["leaders"] += 1
+            task = asyncio.ensure_future(self._run(key, fn, lookup))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one disconnecting caller does not cancel the shared work
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, fn, lookup):
+        if self.lease is None:
+            return await fn()
+
+        deadline = time.monotonic() + self.wait_timeout
+        while not await self.lease.acquire(key):
+            if time.monotonic() >= deadline:
+                self._counters["leaseTimeouts"] += 1
+                return await fn()
+            self._counters["leaseWaits"] += 1
+            await asyncio.sleep(self.poll_interval)
+            if lookup is not None:
+                result = await lookup()
+                if result is not None:
+                    self._counters["leaseHits"] += 1
+                    return result
+        try:
+            # The previous leader may have finished between our polls
+            if lookup is not None:
+                result = await lookup()
+                if result is not None:
+                    self._counters["leaseHits"] += 1
+                    return result
+            return await fn()
+        finally:
+            await self.lease.release(key)
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "inFlight": len(self._inflight),
+            "crossWorker": self.lease is not None,
+        }
@@ -0,0 +1,169 @@
+"""Incrementally maintained workout streaks.
+
+Each user has one document in `user_streaks` holding the current run of
+consecutive workout days, the last active day and the longest run seen.
+It is updated atomically whenever a workout log is written, so the stats
+routes read it in O(1) instead of walking the log history.
+
+Rebuild from `workout_logs` after a migration or manual data fix with:
+
+    python streaks.py --rebuild [--user USER_ID]
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def _shift(date: str, days: int) -> str:
+    return (datetime.strptime(date, DATE_FORMAT) + timedelta(days=days)).strftime(DATE_FORMAT)
+
+
+def _streak_update(user_id: str, date: str) -> UpdateOne:
+    previous_day = _shift(date, -1)
+    # Single pipeline update so concurrent log writes cannot lose increments.
+    # Only valid for days after lastActiveDate; callers recompute the streak
+    # for backdated days, which can join or split runs anywhere in history.
+    return UpdateOne(
+        {"userId": user_id},
+        [
+            {"$set": {
+                "currentStreak": {"$switch": {
+                    "branches": [
+                        {"case": {"$gte": ["$lastActiveDate", date]}, "then": "$currentStreak"},
+                        {"case": {"$eq": ["$lastActiveDate", previous_day]},
+                         "then": {"$add": ["$currentStreak", 1]}},
+                    ],
+                    "default": 1,
+                }},
+                "lastActiveDate": {"$cond": [
+                    {"$gte": ["$lastActiveDate", date]}, "$lastActiveDate", date,
+                ]},
+                "updatedAt": datetime.utcnow(),
+                "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]},
+            }},
+            {"$set": {
+                "longestStreak": {"$max": [{"$ifNull": ["$longestStreak", 0]}, "$currentStreak"]},
+            }},
+        ],
+        upsert=True,
+    )
+
+
+async def record_workout_day(db, user_id: str, date: str):
+    await record_workout_days(db, user_id, [date])
+
+
+async def record_workout_days(db, user_id: str, dates):
+    """Fold newly logged days into the streak; call after the logs are written."""
+    dates = sorted(set(dates))
+    if not dates:
+        return
+    state = await db.user_streaks.find_one({"userId": user_id}, {"_id": 0, "lastActiveDate": 1})
+    # A day equal to lastActiveDate is a no-op for _streak_update; only
+    # strictly older days can join or split runs and need the full history
+    if state and dates[0] < state["lastActiveDate"]:
+        await recompute_streak(db, user_id)
+        return
+    # Oldest first, in order, so each day extends the run left by the previous one
+    await db.user_streaks.bulk_write(
+        [_streak_update(user_id, date) for date in dates], ordered=True
+    )
+
+
+async def get_current_streak(db, user_id: str) -> int:
+    state = await db.user_streaks.find_one(
+        {"userId": user_id}, {"_id": 0, "currentStreak": 1, "lastActiveDate": 1}
+    )
+    if not state:
+        return 0
+    today = datetime.now().strftime(DATE_FORMAT)
+    # A streak is still alive if the user worked out today or yesterday
+    if state["lastActiveDate"] in (today, _shift(today, -1)):
+        return state["currentStreak"]
+    return 0
+
+
+def streak_from_dates(dates) -> dict:
+    """Compute streak state from distinct workout dates in ascending order."""
+    current = longest = 0
+    last = None
+    for date in dates:
+        if last is not None and date == _shift(last, 1):
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+        last = date
+    return {"currentStreak": current, "lastActiveDate": last, "longestStreak": longest}
+
+
+async def recompute_streak(db, user_id: str, attempts: int = 3):
+    """Recompute a user's streak from their distinct workout dates.
+
+    Every streak write bumps `revision`; the recomputed state is only
+    written if no incremental update landed while the logs were read,
+    otherwise the recompute starts over (unguarded on the last attempt).
+    """
+    for attempt in range(attempts):
+        state = await db.user_streaks.find_one({"userId": user_id}, {"_id": 0, "revision": 1})
+        cursor = db.workout_logs.aggregate([
+            {"$match": {"userId": user_id}},
+            {"$group": {"_id": "$date"}},
+            {"$sort": {"_id": 1}},
+        ])
+        dates = [doc["_id"] async for doc in cursor]
+        revision = (state or {}).get("revision")
+        guard = {"userId": user_id}
+        if attempt < attempts - 1:
+            # null also matches a missing document or field; an upsert then
+            # collides with a concurrent insert on the unique userId index
+            guard["revision"] = revision
+        if not dates:
+            await db.user_streaks.delete_one(guard)
+            return
+        update = {"$set": {
+            **streak_from_dates(dates), "updatedAt": datetime.utcnow(), "revision": (revision or 0) + 1,
+        }}
+        try:
+            result = await db.user_streaks.update_one(guard, update, upsert=state is None)
+        except DuplicateKeyError:
+            continue
+        if result.matched_count or result.upserted_id is not None:
+            return
+
+
+async def rebuild_streaks(db, user_id: str = None) -> int:
+    user_ids = [user_id] if user_id else await db.workout_logs.distinct("userId")
+    for uid in user_ids:
+        await recompute_streak(db, uid)
+    return len(user_ids)
+
+
+async def _main(argv):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if "--rebuild" not in argv:
+        print("usage: python streaks.py --rebuild [--user USER_ID]")
+        return 2
+    user_id = argv[argv.index("--user") + 1] if "--user" in argv else None
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        count = await rebuild_streaks(client[os.environ['DB_NAME']], user_id)
+        print(f"Rebuilt streaks for {count} user(s)")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,199 @@
+"""Bucketed weight time series with server-side downsampling.
+
+Weigh-ins are mirrored into one `weight_buckets` document per user and
+month, so a date range is read as a handful of small documents instead of
+one row per entry. `weight_series` turns those points into a chart-ready
+series: LTTB-downsampled values plus a rolling average and linear trend,
+computed over the full-resolution data with NumPy.
+
+Backfill buckets from `weight_entries` with:
+
+    python weights.py --rebuild [--user USER_ID]
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import date as date_type
+from pathlib import Path
+
+import numpy as np
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+def _month(date: str) -> str:
+    return date[:7]
+
+
+def _months_between(start: str, end: str):
+    year, month = int(start[:4]), int(start[5:7])
+    end_year, end_month = int(end[:4]), int(end[5:7])
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+async def record_weight(db, entry: dict):
+    await db.weight_buckets.update_one(
+        {"userId": entry["userId"], "month": _month(entry["date"])},
+        {
+            "$push": {"points": {"id": entry["id"], "date": entry["date"], "weight": entry["weight"]}},
+            "$inc": {"count": 1},
+        },
+        upsert=True,
+    )
+
+
+async def record_weights(db, entries):
+    buckets = {}
+    for entry in entries:
+        buckets.setdefault((entry["userId"], _month(entry["date"])), []).append(
+            {"id": entry["id"], "date": entry["date"], "weight": entry["weight"]}
+        )
+    if not buckets:
+        return
+    await db.weight_buckets.bulk_write([
+        UpdateOne(
+            {"userId": user_id, "month": month},
+            {"$push": {"points": {"$each": points}}, "$inc": {"count": len(points)}},
+            upsert=True,
+        )
+        for (user_id, month), points in buckets.items()
+    ], ordered=False)
+
+
+async def recompute_months(db, months) -> None:
+    """Rebuild the buckets of the given (userId, month) pairs from `weight_entries`."""
+    for user_id, month in set(months):
+        entries = await db.weight_entries.find(
+            {"userId": user_id, "date": {"$gte": f"{month}-01", "$lte": f"{month}-31"}},
+            {"_id": 0, "id": 1, "date": 1, "weight": 1},
+        ).sort("date", 1).to_list(None)
+        if not entries:
+            await db.weight_buckets.delete_one({"userId": user_id, "month": month})
+            continue
+        await db.weight_buckets.update_one(
+            {"userId": user_id, "month": month},
+            {"$set": {"points": entries, "count": len(entries)}},
+            upsert=True,
+        )
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets; returns indices of the points to keep."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    # Interior points split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        next_end = max(next_end, next_start + 1)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        ax, ay = x[selected], y[selected]
+        areas = np.abs((ax - avg_x) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y - ay))
+        selected = start + int(np.argmax(areas))
+        keep[i + 1] = selected
+    return keep
+
+
+def rolling_mean(y: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over up to `window` points (shorter at the start)."""
+    csum = np.cumsum(np.insert(y, 0, 0.0))
+    counts = np.minimum(np.arange(1, len(y) + 1), window)
+    return (csum[1:] - csum[np.arange(1, len(y) + 1) - counts]) / counts
+
+
+async def weight_series(db, user_id: str, start: str, end: str, points: int, window: int = 7) -> dict:
+    buckets = await db.weight_buckets.find(
+        {"userId": user_id, "month": {"$in": _months_between(start, end)}},
+        {"_id": 0, "points": 1},
+    ).to_list(None)
+    raw = []
+    skipped = 0
+    for bucket in buckets:
+        for p in bucket["points"]:
+            # Rows written before dates were validated must not fail the whole series
+            try:
+                day = date_type.fromisoformat(p["date"])
+                weight = float(p["weight"])
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            if start <= day.isoformat() <= end:
+                raw.append((day.toordinal(), weight, day.isoformat()))
+    if skipped:
+        logger.warning(f"Skipped {skipped} malformed weight point(s) for {user_id}")
+    raw.sort()
+    if not raw:
+        return {"dates": [], "weights": [], "rollingAvg": [], "count": 0,
+                "trend": {"slopePerWeek": None, "intercept": None}}
+
+    x = np.array([row[0] for row in raw], dtype=np.float64)
+    y = np.array([row[1] for row in raw], dtype=np.float64)
+    rolling = rolling_mean(y, window)
+
+    trend = {"slopePerWeek": None, "intercept": None}
+    if len(x) >= 2 and x[-1] > x[0]:
+        slope, intercept = np.polyfit(x - x[0], y, 1)
+        trend = {"slopePerWeek": round(float(slope) * 7, 4), "intercept": round(float(intercept), 3)}
+
+    keep = lttb(x, y, points)
+    return {
+        "dates": [raw[i][2] for i in keep],
+        "weights": y[keep].round(2),
+        "rollingAvg": rolling[keep].round(2),
+        "count": len(raw),
+        "trend": trend,
+    }
+
+
+async def rebuild_buckets(db, user_id: str = None) -> int:
+    match = {"userId": user_id} if user_id else {}
+    await db.weight_buckets.delete_many(match)
+    cursor = db.weight_entries.aggregate([
+        {"$match": match},
+        {"$sort": {"date": 1}},
+        {"$group": {
+            "_id": {"userId": "$userId", "month": {"$substrCP": ["$date", 0, 7]}},
+            "points": {"$push": {"id": "$id", "date": "$date", "weight": "$weight"}},
+            "count": {"$sum": 1},
+        }},
+    ])
+    count = 0
+    async for doc in cursor:
+        key = doc.pop("_id")
+        await db.weight_buckets.update_one(key, {"$set": doc}, upsert=True)
+        count += 1
+    return count
+
+
+async def _main(argv):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if "--rebuild" not in argv:
+        print("usage: python weights.py --rebuild [--user USER_ID]")
+        return 2
+    user_id = argv[argv.index("--user") + 1] if "--user" in argv else None
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        count = await rebuild_buckets(client[os.environ['DB_NAME']], user_id)
+        print(f"Rebuilt {count} monthly weight bucket(s)")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -346,6 +346,44 @@ class FitGeniusAPITester:
             self.log_test("Progress Add Weight", False, f"Error: {str(e)}")
         return False
     
+    def test_stats_cache_consistency(self):
+        """Test that cached progress/dashboard responses reflect new writes"""
+        if not self.user_id:
+            self.log_test("Stats Cache Consistency", False, "No user_id available")
+            return False
+        
+        try:
+            today = datetime.now().strftime("%Y-%m-%d")
+            
+            # Prime the caches
+            self.session.get(f"{API_BASE}/progress?userId={self.user_id}", timeout=10)
+            before = self.session.get(f"{API_BASE}/users/{self.user_id}/dashboard", timeout=10).json()
+            calories_before = before['nutrition']['consumed']['calories']
+            
+            self.session.post(f"{API_BASE}/progress/add-weight",
+                              json={"userId": self.user_id, "weight": 74.8, "date": today}, timeout=10)
+            self.session.post(f"{API_BASE}/nutrition/add-meal",
+                              json={"userId": self.user_id, "name": "Protein Shake", "calories": 180,
+                                    "protein": 30, "carbs": 8, "fats": 3, "date": today}, timeout=10)
+            
+            progress = self.session.get(f"{API_BASE}/progress?userId={self.user_id}", timeout=10).json()
+            after = self.session.get(f"{API_BASE}/users/{self.user_id}/dashboard", timeout=10).json()
+            
+            weights = [entry.get('weight') for entry in progress.get('weightData', [])]
+            calories_after = after['nutrition']['consumed']['calories']
+            if 74.8 not in weights:
+                self.log_test("Stats Cache Consistency", False, f"Stale progress after add-weight: {weights}")
+            elif calories_after != calories_before + 180:
+                self.log_test("Stats Cache Consistency", False,
+                            f"Stale dashboard after add-meal: {calories_before} -> {calories_after}")
+            else:
+                self.log_test("Stats Cache Consistency", True,
+                            "Progress and dashboard reflect writes immediately", after)
+                return True
+        except Exception as e:
+            self.log_test("Stats Cache Consistency", False, f"Error: {str(e)}")
+        return False
+    
     def test_ai_chat_history(self):
         """Test AI chat history endpoint"""
         if not self.user_id:
@@ -423,6 +461,7 @@ class FitGeniusAPITester:
             ("Nutrition Add Meal", self.test_nutrition_add_meal),
             ("Progress GET", self.test_progress_get),
             ("Progress Add Weight", self.test_progress_add_weight),
+            ("Stats Cache Consistency", self.test_stats_cache_consistency),
             ("AI Chat History", self.test_ai_chat_history),
             ("AI Chat", self.test_ai_chat),
         ]
@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other flatly, as they do under uvicorn
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def db():
+    from mongomock_motor import AsyncMongoMockClient
+
+    return AsyncMongoMockClient()["fitgenius_test"]
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from ai_workout import GeneratedWorkout, WorkoutParseError, parse_workout, repair_json
+
+EXERCISE = {"name": "Squat", "sets": 3, "reps": "8-12", "rest": "60s"}
+PLAN = {"name": "Leg Day", "description": "Lower body", "duration": 45, "exercises": [EXERCISE, EXERCISE]}
+VALID = json.dumps(PLAN)
+
+
+def test_valid_reply_needs_no_fixes():
+    workout, fixes = parse_workout(VALID)
+    assert fixes == []
+    assert workout.model_dump()["exercises"][0] == {**EXERCISE, "category": None, "description": None}
+
+
+def test_markdown_fences_are_stripped_without_counting_as_repair():
+    workout, fixes = parse_workout(f"```json\n{VALID}\n```")
+    assert fixes == []
+    assert workout.name == "Leg Day"
+
+
+def test_prose_around_the_object():
+    workout, fixes = parse_workout(f"Sure! Here is your plan:\n```json\n{VALID}\n```\nEnjoy {{and rest}}!")
+    assert "prose" in fixes
+    assert len(workout.exercises) == 2
+
+
+def test_trailing_commas_are_removed():
+    text = VALID[:-2] + "],}"
+    workout, fixes = parse_workout(text.replace('"rest": "60s"}', '"rest": "60s",}'))
+    assert "trailing_comma" in fixes
+    assert len(workout.exercises) == 2
+
+
+def test_trailing_comma_fix_leaves_string_contents_alone():
+    text = '{"name": "a,]", "exercises": [{"name": "A, ]", "sets": 3, "reps": "10, }"},],}'
+    workout, fixes = parse_workout(text)
+    assert fixes == ["trailing_comma"]
+    assert workout.name == "a,]"
+    assert workout.exercises[0].name == "A, ]"
+    assert workout.exercises[0].reps == "10, }"
+
+
+def test_truncated_mid_array_keeps_complete_exercises():
+    text = VALID[:VALID.rindex('"reps"') + 3]
+    workout, fixes = parse_workout(text)
+    assert fixes == ["truncated"]
+    assert [exercise.name for exercise in workout.exercises] == ["Squat", "Squat"]
+
+
+def test_truncated_inside_first_exercise():
+    workout, fixes = parse_workout('{"name": "x", "exercises": [{"name": "x", "sets": 3, "re')
+    assert fixes == ["truncated"]
+    assert workout.exercises[0].name == "x"
+    assert workout.exercises[0].reps == "10"
+
+
+def test_truncated_after_complete_value():
+    workout, fixes = parse_workout('{"exercises": [{"name": "x", "sets": 3}], "name": "Quick"')
+    assert fixes == ["truncated"]
+    assert workout.name == "Quick"
+
+
+def test_truncated_string_with_escaped_quote():
+    text = '{"name": "P \\"x}\\"", "exercises": [{"name": "A", "sets": 3}, {"name": "B", "se'
+    workout, _ = parse_workout(text)
+    assert workout.name == 'P "x}"'
+    assert [exercise.name for exercise in workout.exercises] == ["A", "B"]
+
+
+def test_loose_field_values_are_coerced():
+    workout, _ = parse_workout(json.dumps({
+        "name": "Cardio",
+        "duration": "45 minutes",
+        "exercises": [{"name": "Row", "sets": "3-4", "reps": 12, "rest": None}],
+    }))
+    assert workout.duration == 45
+    assert workout.exercises[0].sets == 3
+    assert workout.exercises[0].reps == "12"
+    assert workout.exercises[0].rest == "60s"
+
+
+def test_duration_in_hours():
+    workout = GeneratedWorkout.model_validate({"duration": "1 hour", "exercises": [EXERCISE]})
+    assert workout.duration == 60
+
+
+def test_repair_reports_every_fix():
+    text, fixes = repair_json('Plan: {"name": "x", "exercises": [{"name": "a", "sets": 2,}, {"na')
+    assert fixes == ["prose", "trailing_comma", "truncated"]
+    assert json.loads(text)["exercises"] == [{"name": "a", "sets": 2}]
+
+
+@pytest.mark.parametrize("text", [
+    "I cannot help with that.",
+    '{"name": "Pla',
+    '{"name": "No exercises"}',
+    '{"name": "x", "exercises": [{"sets": 3}]}',
+])
+def test_unrepairable_replies_raise(text):
+    with pytest.raises(WorkoutParseError):
+        parse_workout(text)
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+from auth_pool import AuthPoolSaturated, AuthWorkerPool
+
+
+class BlockingContext:
+    """Hashes only once `release` is set, so jobs pile up in the queue."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.release.wait(5)
+        return f"hashed:{password}"
+
+    def verify(self, password, hashed):
+        return hashed == f"hashed:{password}"
+
+
+def test_cancelled_queued_jobs_release_their_slots():
+    async def scenario():
+        context = BlockingContext()
+        pool = AuthWorkerPool(context, size=1, queue_depth=2)
+        try:
+            running = asyncio.ensure_future(pool.hash("running"))
+            queued = [asyncio.ensure_future(pool.hash(f"queued-{i}")) for i in range(2)]
+            await asyncio.sleep(0.05)
+            try:
+                await pool.hash("overflow")
+                raise AssertionError("pool should be saturated")
+            except AuthPoolSaturated:
+                pass
+
+            for task in queued:
+                task.cancel()
+            await asyncio.gather(*queued, return_exceptions=True)
+            after_cancel = pool.stats()["outstanding"]
+
+            context.release.set()
+            assert await running == "hashed:running"
+            assert await pool.hash("again") == "hashed:again"
+            return after_cancel, pool.stats()
+        finally:
+            context.release.set()
+            pool.shutdown()
+
+    after_cancel, stats = asyncio.run(scenario())
+    assert after_cancel == 1
+    assert stats["outstanding"] == 0
+    assert stats["rejected"] == 1 and stats["completed"] == 2
@@ -0,0 +1,96 @@
+import asyncio
+
+from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
+
+from bulk import insert_items, summarize, validate_items
+from nutrition import record_meals, recompute_days
+from weights import record_weights, recompute_months
+
+
+class Item(BaseModel):
+    userId: str
+    date: str
+    calories: float = 0
+    idempotencyKey: str = None
+
+
+async def ingest(collection, items):
+    # mongomock ignores partialFilterExpression, so keys are always set here
+    await collection.create_indexes([
+        IndexModel([("userId", ASCENDING), ("idempotencyKey", ASCENDING)], unique=True)
+    ])
+    valid, results = validate_items(items, Item)
+    written, duplicates = await insert_items(collection, valid, results)
+    return written, duplicates, summarize(results, len(items))
+
+
+def test_malformed_items_are_reported_per_item(db):
+    items = [
+        {"userId": "u1", "date": "2025-01-01", "idempotencyKey": "a"},
+        "not an object",
+        {"userId": "u1"},
+        None,
+    ]
+    _, _, summary = asyncio.run(ingest(db.meals, items))
+    assert [r["status"] for r in summary["results"]] == ["inserted", "invalid", "invalid", "invalid"]
+    assert summary["inserted"] == 1 and summary["invalid"] == 3
+    assert summary["results"][1]["error"] == "Item must be an object"
+
+
+def test_duplicates_return_the_stored_id(db):
+    async def scenario():
+        first, _, first_summary = await ingest(db.meals, [{"userId": "u1", "date": "2025-01-01", "idempotencyKey": "a"}])
+        _, duplicates, summary = await ingest(db.meals, [
+            {"userId": "u1", "date": "2025-01-01", "idempotencyKey": "a"},
+            {"userId": "u1", "date": "2025-01-02", "idempotencyKey": "b"},
+        ])
+        return first_summary, summary, duplicates
+
+    first_summary, summary, duplicates = asyncio.run(scenario())
+    stored_id = first_summary["results"][0]["id"]
+    assert summary["results"][0] == {"index": 0, "status": "duplicate", "id": stored_id}
+    assert summary["results"][1]["status"] == "inserted"
+    assert [doc["id"] for doc in duplicates] == [stored_id]
+
+
+def test_retry_repairs_nutrition_rollup_after_failed_first_attempt(db):
+    items = [
+        {"userId": "u1", "date": "2025-01-01", "calories": 500, "idempotencyKey": "a"},
+        {"userId": "u1", "date": "2025-01-01", "calories": 300, "idempotencyKey": "b"},
+    ]
+
+    async def scenario():
+        # First attempt: rows land, the rollup step "fails" and never runs
+        await ingest(db.meals, items)
+        assert await db.nutrition_daily.find_one({"userId": "u1"}) is None
+        # Retry: everything is a duplicate, so the affected day is recomputed
+        written, duplicates, _ = await ingest(db.meals, items)
+        await record_meals(db, written)
+        await recompute_days(db, {(doc["userId"], doc["date"]) for doc in duplicates})
+        # A second retry must not double count
+        written, duplicates, _ = await ingest(db.meals, items)
+        await record_meals(db, written)
+        await recompute_days(db, {(doc["userId"], doc["date"]) for doc in duplicates})
+        return await db.nutrition_daily.find_one({"userId": "u1", "date": "2025-01-01"})
+
+    rollup = asyncio.run(scenario())
+    assert rollup["calories"] == 800
+    assert rollup["mealCount"] == 2
+
+
+def test_recompute_months_rebuilds_weight_bucket(db):
+    async def scenario():
+        entries = [
+            {"id": "w1", "userId": "u1", "date": "2025-01-03", "weight": 80.0},
+            {"id": "w2", "userId": "u1", "date": "2025-01-01", "weight": 81.0},
+        ]
+        await db.weight_entries.insert_many([dict(entry) for entry in entries])
+        await record_weights(db, entries)
+        await record_weights(db, entries)  # a double-applied rollup
+        await recompute_months(db, {("u1", "2025-01")})
+        return await db.weight_buckets.find_one({"userId": "u1", "month": "2025-01"})
+
+    bucket = asyncio.run(scenario())
+    assert bucket["count"] == 2
+    assert [point["date"] for point in bucket["points"]] == ["2025-01-01", "2025-01-03"]
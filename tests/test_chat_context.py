@@ -0,0 +1,56 @@
+import asyncio
+import gc
+import logging
+from datetime import datetime, timedelta
+
+import chat_context
+from chat_context import ChatContextBuilder
+
+
+async def seed(db, user_id, count):
+    start = datetime(2026, 1, 1)
+    await db.chat_messages.insert_many([
+        {"userId": user_id, "text": f"message {i}", "isUser": i % 2 == 0, "timestamp": start + timedelta(minutes=i)}
+        for i in range(count)
+    ])
+    return start + timedelta(minutes=count)
+
+
+def test_refresh_survives_garbage_collection_and_is_released(db):
+    async def scenario():
+        async def summarizer(previous, turns):
+            await asyncio.sleep(0.02)
+            gc.collect()
+            return "summary"
+
+        builder = ChatContextBuilder(db, summarizer, summarize_after=3)
+        before = await seed(db, "u1", 5)
+        builder.schedule_refresh("u1", before)
+        tracked = len(chat_context._background_tasks)
+        gc.collect()
+        while chat_context._background_tasks:
+            await asyncio.sleep(0.01)
+        return tracked, await db.chat_summaries.find_one({"userId": "u1"})
+
+    tracked, summary = asyncio.run(scenario())
+    assert tracked == 1
+    assert summary["summary"] == "summary"
+
+
+def test_failed_refresh_is_logged_and_released(db, caplog, monkeypatch):
+    async def scenario():
+        builder = ChatContextBuilder(db, None, summarize_after=3)
+
+        async def broken(user_id, before):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(builder, "_refresh", broken)
+        builder.schedule_refresh("u1", datetime(2026, 1, 1))
+        await asyncio.sleep(0.01)
+        return builder
+
+    with caplog.at_level(logging.ERROR, logger="chat_context"):
+        builder = asyncio.run(scenario())
+    assert not chat_context._background_tasks
+    assert "u1" not in builder._refreshing
+    assert "Chat summary refresh for u1 failed" in caplog.text and "boom" in caplog.text
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobWorker
+
+
+def expire_lease(db, job_id):
+    return db.ai_jobs.update_one(
+        {"id": job_id}, {"$set": {"leaseExpiresAt": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+
+def test_expired_lease_is_reclaimed_while_attempts_remain(db):
+    async def scenario():
+        queue = JobQueue(db, max_attempts=2)
+        job = await queue.enqueue("workout", {}, "u1")
+        first = await queue.claim()
+        await expire_lease(db, job["id"])
+        second = await queue.claim()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["attempts"] == 1
+    assert second["id"] == first["id"] and second["attempts"] == 2
+
+
+def test_expired_final_attempt_is_failed_not_reclaimed(db):
+    async def scenario():
+        queue = JobQueue(db, max_attempts=1)
+        job = await queue.enqueue("workout", {}, "u1")
+        await queue.claim()
+        await expire_lease(db, job["id"])
+        reclaimed = await queue.claim()
+        failed = await queue.fail_abandoned()
+        return reclaimed, failed, await queue.get(job["id"])
+
+    reclaimed, failed, stored = asyncio.run(scenario())
+    assert reclaimed is None
+    assert failed == 1
+    assert stored["status"] == FAILED and stored["attempts"] == 1
+
+
+def test_heartbeat_extends_the_lease_until_reclaimed(db):
+    async def scenario():
+        queue = JobQueue(db, lease_seconds=120)
+        job = await queue.enqueue("workout", {}, "u1")
+        claimed = await queue.claim()
+        await expire_lease(db, job["id"])
+        extended = await queue.heartbeat(claimed)
+        lease = (await db.ai_jobs.find_one({"id": job["id"]}))["leaseExpiresAt"]
+
+        await expire_lease(db, job["id"])
+        await queue.claim()
+        # The stale attempt can neither keep nor finish the job
+        lost = await queue.heartbeat(claimed)
+        await queue.complete(claimed, {"stale": True})
+        return extended, lease, lost, await queue.get(job["id"])
+
+    extended, lease, lost, stored = asyncio.run(scenario())
+    assert extended and lease > datetime.utcnow() + timedelta(seconds=60)
+    assert not lost
+    assert stored["status"] == RUNNING and stored["attempts"] == 2 and stored["result"] is None
+
+
+def test_worker_heartbeats_a_long_running_handler(db):
+    async def scenario():
+        queue = JobQueue(db, lease_seconds=0.15)
+
+        async def handler(payload):
+            await asyncio.sleep(0.4)
+            return {"done": True}
+
+        worker = JobWorker(queue, {"workout": handler}, concurrency=1, poll_interval=0.01)
+        job = await queue.enqueue("workout", {}, "u1")
+        worker.start()
+        await asyncio.sleep(0.25)
+        # Past the original lease, but another worker must not take it over
+        stolen = await queue.claim()
+        await asyncio.sleep(0.3)
+        await worker.stop()
+        return stolen, await queue.get(job["id"])
+
+    stolen, stored = asyncio.run(scenario())
+    assert stolen is None
+    assert stored["status"] == SUCCEEDED and stored["attempts"] == 1
+
+
+def test_failed_attempt_is_requeued_with_backoff(db):
+    async def scenario():
+        queue = JobQueue(db, max_attempts=2, retry_backoff=60)
+        job = await queue.enqueue("workout", {}, "u1")
+        await queue.fail(await queue.claim(), "boom")
+        return await queue.claim(), await queue.get(job["id"])
+
+    claimed, stored = asyncio.run(scenario())
+    assert claimed is None
+    assert stored["status"] == QUEUED and stored["error"] == "boom"
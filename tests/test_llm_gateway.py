@@ -0,0 +1,214 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_gateway import (
+    CLOSED, HALF_OPEN, OPEN, CircuitOpen, GatewayOverloaded, GatewayTimeout, LLMGateway,
+)
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeLlm:
+    """Answers after `latency` seconds, or raises the next queued error."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.errors = []
+        self.calls = 0
+
+    async def send(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def stream(self, tokens=3):
+        for i in range(tokens):
+            await asyncio.sleep(self.latency)
+            yield f"t{i}"
+
+
+def gateway(**kwargs):
+    options = {"max_concurrency": 1, "max_queue": 1, "timeout": 1.0, "max_retries": 0,
+               "backoff_base": 0.001, "breaker_threshold": 2, "breaker_reset": 0.05}
+    options.update(kwargs)
+    return LLMGateway(**options)
+
+
+def test_queue_full_is_rejected():
+    async def scenario():
+        gw = gateway()
+        llm = FakeLlm(latency=0.05)
+        running = [asyncio.create_task(gw.call(llm.send)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(GatewayOverloaded):
+            await gw.call(llm.send)
+        assert await asyncio.gather(*running) == ["ok", "ok"]
+        return gw.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejectedQueueFull"] == 1
+    assert stats["inFlight"] == 0 and stats["queued"] == 0
+
+
+def test_timeout_raises_and_trips_breaker():
+    async def scenario():
+        gw = gateway(breaker_threshold=1)
+        with pytest.raises(GatewayTimeout):
+            await gw.call(FakeLlm(latency=0.2).send, timeout=0.02)
+        return gw
+
+    gw = asyncio.run(scenario())
+    assert gw.stats()["timeouts"] == 1
+    assert gw.state == OPEN
+
+
+def test_retryable_errors_are_retried():
+    async def scenario():
+        gw = gateway(max_retries=2)
+        llm = FakeLlm()
+        llm.errors = [ProviderError(503), ProviderError(429)]
+        return await gw.call(llm.send), llm.calls, gw.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert result == "ok" and calls == 3
+    assert stats["retries"] == 2
+
+
+def test_breaker_opens_half_opens_and_closes():
+    async def scenario():
+        gw = gateway()
+        llm = FakeLlm()
+        for _ in range(2):
+            llm.errors = [ProviderError(502)]
+            with pytest.raises(ProviderError):
+                await gw.call(llm.send)
+        assert gw.state == OPEN
+        with pytest.raises(CircuitOpen):
+            await gw.call(llm.send)
+
+        await asyncio.sleep(0.06)
+        assert gw.state == HALF_OPEN
+        # Only one probe while half-open
+        probe = asyncio.create_task(gw.call(FakeLlm(latency=0.02).send))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpen):
+            await gw.call(llm.send)
+        assert await probe == "ok"
+        return gw
+
+    gw = asyncio.run(scenario())
+    assert gw.state == CLOSED
+    assert gw.stats()["circuitOpened"] == 1
+
+
+def test_failed_probe_reopens_the_circuit():
+    async def scenario():
+        gw = gateway(breaker_threshold=1)
+        llm = FakeLlm()
+        llm.errors = [ConnectionError("reset"), ConnectionError("reset")]
+        with pytest.raises(ConnectionError):
+            await gw.call(llm.send)
+        await asyncio.sleep(0.06)
+        with pytest.raises(ConnectionError):
+            await gw.call(llm.send)
+        return gw
+
+    gw = asyncio.run(scenario())
+    assert gw.state == OPEN
+    assert gw.stats()["circuitOpened"] == 2
+
+
+@pytest.mark.parametrize("error", [ProviderError(400), ProviderError(422), ValueError("bad schema")])
+def test_rejected_requests_do_not_trip_breaker(error):
+    async def scenario():
+        gw = gateway(breaker_threshold=1)
+        llm = FakeLlm()
+        llm.errors = [error]
+        with pytest.raises(type(error)):
+            await gw.call(llm.send)
+        return gw
+
+    gw = asyncio.run(scenario())
+    assert gw.state == CLOSED
+    assert gw.stats()["failed"] == 1
+
+
+def test_rejected_request_closes_a_half_open_circuit():
+    async def scenario():
+        gw = gateway(breaker_threshold=1)
+        llm = FakeLlm()
+        llm.errors = [ProviderError(500), ProviderError(400)]
+        with pytest.raises(ProviderError):
+            await gw.call(llm.send)
+        await asyncio.sleep(0.06)
+        with pytest.raises(ProviderError):
+            await gw.call(llm.send)
+        return gw
+
+    assert asyncio.run(scenario()).state == CLOSED
+
+
+def test_cancellation_releases_slot_without_tripping_breaker():
+    async def scenario():
+        gw = gateway(breaker_threshold=1)
+        task = asyncio.create_task(gw.call(FakeLlm(latency=1).send))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert await gw.call(FakeLlm().send) == "ok"
+        return gw
+
+    gw = asyncio.run(scenario())
+    assert gw.state == CLOSED
+    assert gw.stats()["inFlight"] == 0 and gw.stats()["failed"] == 0
+
+
+def test_stream_yields_all_chunks_inside_one_slot():
+    async def scenario():
+        gw = gateway()
+        chunks = [chunk async for chunk in gw.stream(lambda: FakeLlm().stream(3))]
+        return chunks, gw.stats()
+
+    chunks, stats = asyncio.run(scenario())
+    assert chunks == ["t0", "t1", "t2"]
+    assert stats["calls"] == 1 and stats["succeeded"] == 1 and stats["inFlight"] == 0
+
+
+def test_stream_deadline_covers_the_whole_body():
+    async def scenario():
+        gw = gateway(breaker_threshold=1)
+        chunks = []
+        started = time.monotonic()
+        # Each token arrives well within the timeout; the stream as a whole does not
+        with pytest.raises(GatewayTimeout):
+            async for chunk in gw.stream(lambda: FakeLlm(latency=0.02).stream(100), timeout=0.1):
+                chunks.append(chunk)
+        return gw, chunks, time.monotonic() - started
+
+    gw, chunks, elapsed = asyncio.run(scenario())
+    assert 0 < len(chunks) < 100
+    assert elapsed < 0.5
+    assert gw.stats()["timeouts"] == 1 and gw.stats()["inFlight"] == 0
+    assert gw.state == OPEN
+
+
+def test_closing_a_stream_early_frees_the_slot():
+    async def scenario():
+        gw = gateway(breaker_threshold=1)
+        stream = gw.stream(lambda: FakeLlm().stream(10))
+        assert await stream.__anext__() == "t0"
+        await stream.aclose()
+        return gw
+
+    gw = asyncio.run(scenario())
+    assert gw.stats()["inFlight"] == 0
+    assert gw.state == CLOSED
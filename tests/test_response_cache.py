@@ -0,0 +1,142 @@
+import asyncio
+
+import orjson
+import pytest
+
+from response_cache import LocalCacheBackend, RedisCacheBackend, UserResponseCache
+
+
+class FakeRedis:
+    """The slice of redis.asyncio.Redis the cache uses, shared like a server."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+class Source:
+    """Stands in for the database a response is computed from."""
+
+    def __init__(self):
+        self.value = 0
+        self.computes = 0
+
+    async def compute(self):
+        self.computes += 1
+        return {"value": self.value}
+
+
+def local_backend(**kwargs):
+    return LocalCacheBackend(**kwargs)
+
+
+def redis_backend(**kwargs):
+    return RedisCacheBackend(client=FakeRedis())
+
+
+@pytest.fixture(params=[local_backend, redis_backend], ids=["local", "redis"])
+def cache(request):
+    return UserResponseCache(request.param())
+
+
+def read(cache, source, user_id="u1", endpoint="stats"):
+    return orjson.loads(asyncio.run(cache.get_or_compute(endpoint, user_id, source.compute)))
+
+
+def test_hit_after_miss(cache):
+    source = Source()
+    assert read(cache, source) == {"value": 0}
+    assert read(cache, source) == {"value": 0}
+    assert source.computes == 1
+    assert cache.stats()["endpoints"]["stats"] == {"hits": 1, "misses": 1, "hitRate": 0.5}
+
+
+def test_write_invalidates_every_endpoint_for_the_user(cache):
+    source = Source()
+    read(cache, source, endpoint="stats")
+    read(cache, source, endpoint="dashboard")
+    source.value = 1
+    asyncio.run(cache.invalidate("u1"))
+    assert read(cache, source, endpoint="stats") == {"value": 1}
+    assert read(cache, source, endpoint="dashboard") == {"value": 1}
+
+
+def test_invalidation_is_per_user(cache):
+    source = Source()
+    read(cache, source, user_id="u1")
+    read(cache, source, user_id="u2")
+    asyncio.run(cache.invalidate("u1"))
+    read(cache, source, user_id="u2")
+    assert source.computes == 2
+
+
+def test_write_landing_during_compute_is_not_served(cache):
+    source = Source()
+
+    async def slow_compute():
+        snapshot = {"value": source.value}
+        # The write and its invalidation land while this read is in flight
+        source.value = 1
+        await cache.invalidate("u1")
+        return snapshot
+
+    assert orjson.loads(asyncio.run(cache.get_or_compute("stats", "u1", slow_compute))) == {"value": 0}
+    assert read(cache, source) == {"value": 1}
+
+
+def test_version_map_is_bounded():
+    backend = LocalCacheBackend(max_versions=8)
+    cache = UserResponseCache(backend)
+    source = Source()
+    for i in range(100):
+        read(cache, source, user_id=f"user-{i}")
+        asyncio.run(cache.invalidate(f"user-{i}"))
+    assert len(backend._versions) <= 8
+
+
+def test_evicted_version_never_resurrects_a_stale_entry():
+    backend = LocalCacheBackend(max_versions=2)
+    cache = UserResponseCache(backend)
+    source = Source()
+    read(cache, source, user_id="u1")
+    source.value = 1
+    asyncio.run(cache.invalidate("u1"))
+    # Push u1's version out of the LRU
+    for other in ("u2", "u3", "u4"):
+        read(cache, Source(), user_id=other)
+    assert "ver:u1" not in backend._versions
+    assert read(cache, source, user_id="u1") == {"value": 1}
+
+
+def test_shared_redis_invalidates_across_workers():
+    redis = FakeRedis()
+    worker_a = UserResponseCache(RedisCacheBackend(client=redis))
+    worker_b = UserResponseCache(RedisCacheBackend(client=redis))
+    source = Source()
+    read(worker_a, source)
+    assert read(worker_b, source) == {"value": 0}
+    assert source.computes == 1
+
+    source.value = 1
+    asyncio.run(worker_a.invalidate("u1"))
+    assert read(worker_b, source) == {"value": 1}
+
+
+def test_local_backends_do_not_share_invalidations():
+    # Documented limitation: each process only sees its own writes
+    worker_a = UserResponseCache(LocalCacheBackend())
+    worker_b = UserResponseCache(LocalCacheBackend())
+    source = Source()
+    read(worker_b, source)
+    source.value = 1
+    asyncio.run(worker_a.invalidate("u1"))
+    assert read(worker_b, source) == {"value": 0}
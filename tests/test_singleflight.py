@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from singleflight import MongoLease, SingleFlight
+
+
+class Producer:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return {"plan": self.calls}
+
+
+def hold_lease(db, key, seconds=60):
+    return db.llm_leases.insert_one(
+        {"_id": key, "owner": "other-worker", "expiresAt": datetime.utcnow() + timedelta(seconds=seconds)}
+    )
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = SingleFlight()
+        produce = Producer(latency=0.02)
+        results = await asyncio.gather(*(flight.do("k", produce) for _ in range(5)))
+        return results, produce.calls, flight.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [{"plan": 1}] * 5
+    assert stats["leaders"] == 1 and stats["coalesced"] == 4
+
+
+def test_follower_takes_the_leaders_result(db):
+    async def scenario():
+        await hold_lease(db, "k")
+        results = {}
+
+        async def lookup():
+            return results.get("k")
+
+        async def leader_finishes():
+            await asyncio.sleep(0.05)
+            results["k"] = {"plan": "leader"}
+
+        flight = SingleFlight(MongoLease(db), poll_interval=0.01, wait_timeout=5)
+        produce = Producer()
+        _, result = await asyncio.gather(leader_finishes(), flight.do("k", produce, lookup))
+        return result, produce.calls, flight.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert result == {"plan": "leader"} and calls == 0
+    assert stats["leaseHits"] == 1
+
+
+def test_follower_falls_back_to_local_work_after_deadline(db):
+    async def scenario():
+        await hold_lease(db, "k")
+        flight = SingleFlight(MongoLease(db), poll_interval=0.01, wait_timeout=0.1)
+        produce = Producer()
+
+        async def lookup():
+            return None
+
+        result = await asyncio.wait_for(flight.do("k", produce, lookup), 2)
+        return result, produce.calls, flight.stats(), await db.llm_leases.find_one({"_id": "k"})
+
+    result, calls, stats, lease = asyncio.run(scenario())
+    assert result == {"plan": 1} and calls == 1
+    assert stats["leaseTimeouts"] == 1
+    # The stuck leader's lease is left alone
+    assert lease["owner"] == "other-worker"
+
+
+def test_expired_lease_is_taken_over(db):
+    async def scenario():
+        await hold_lease(db, "k", seconds=-1)
+        lease = MongoLease(db)
+        flight = SingleFlight(lease, poll_interval=0.01, wait_timeout=0.1)
+        result = await flight.do("k", Producer())
+        return result, flight.stats(), await db.llm_leases.find_one({"_id": "k"})
+
+    result, stats, lease = asyncio.run(scenario())
+    assert result == {"plan": 1}
+    assert stats["leaseTimeouts"] == 0 and stats["leaseWaits"] == 0
+    assert lease is None
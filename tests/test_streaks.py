@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from streaks import recompute_streak, record_workout_day, record_workout_days
+
+
+def day(offset: int) -> str:
+    return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+async def log(db, user_id, dates, bulk=True):
+    await db.workout_logs.insert_many([{"userId": user_id, "date": date} for date in dates])
+    if bulk:
+        await record_workout_days(db, user_id, dates)
+    else:
+        for date in dates:
+            await record_workout_day(db, user_id, date)
+
+
+async def streak(db, user_id):
+    return await db.user_streaks.find_one({"userId": user_id}, {"_id": 0})
+
+
+def test_consecutive_days_extend_streak(db):
+    async def scenario():
+        await log(db, "u1", [day(-2), day(-1)], bulk=False)
+        await log(db, "u1", [day(0)], bulk=False)
+        return await streak(db, "u1")
+
+    state = asyncio.run(scenario())
+    assert state["currentStreak"] == 3
+    assert state["lastActiveDate"] == day(0)
+
+
+def test_backdated_bulk_insert_joins_current_run(db):
+    async def scenario():
+        await log(db, "u1", [day(0)], bulk=False)
+        await log(db, "u1", [day(-1), day(-2)])
+        return await streak(db, "u1")
+
+    state = asyncio.run(scenario())
+    assert state["currentStreak"] == 3
+    assert state["longestStreak"] == 3
+    assert state["lastActiveDate"] == day(0)
+
+
+def test_backdated_single_log_bridges_gap(db):
+    async def scenario():
+        await log(db, "u1", [day(-3), day(-2), day(0)], bulk=False)
+        assert (await streak(db, "u1"))["currentStreak"] == 1
+        await log(db, "u1", [day(-1)], bulk=False)
+        return await streak(db, "u1")
+
+    state = asyncio.run(scenario())
+    assert state["currentStreak"] == 4
+    assert state["longestStreak"] == 4
+
+
+def test_backdated_old_run_updates_longest_only(db):
+    async def scenario():
+        await log(db, "u1", [day(-1), day(0)], bulk=False)
+        await log(db, "u1", [day(-30), day(-29), day(-28)])
+        return await streak(db, "u1")
+
+    state = asyncio.run(scenario())
+    assert state["currentStreak"] == 2
+    assert state["longestStreak"] == 3
+    assert state["lastActiveDate"] == day(0)
+
+
+def test_bulk_insert_mixing_old_and_new_days(db):
+    async def scenario():
+        await log(db, "u1", [day(-2)], bulk=False)
+        await log(db, "u1", [day(-3), day(-1), day(0)])
+        return await streak(db, "u1")
+
+    state = asyncio.run(scenario())
+    assert state["currentStreak"] == 4
+
+
+def test_same_day_log_does_not_recompute(db, monkeypatch):
+    import streaks
+
+    async def scenario():
+        await log(db, "u1", [day(-1), day(0)])
+        calls = []
+
+        async def counting_recompute(db, user_id, attempts=3):
+            calls.append(user_id)
+
+        monkeypatch.setattr(streaks, "recompute_streak", counting_recompute)
+        await log(db, "u1", [day(0)], bulk=False)
+        await log(db, "u1", [day(0), day(1)])
+        return calls, await streak(db, "u1")
+
+    calls, state = asyncio.run(scenario())
+    assert calls == []
+    assert state["currentStreak"] == 3 and state["lastActiveDate"] == day(1)
+
+
+def test_recompute_retries_when_an_incremental_update_lands(db):
+    async def scenario():
+        await log(db, "u1", [day(-3), day(-1)])
+        await db.workout_logs.insert_one({"userId": "u1", "date": day(-2)})
+
+        async def log_today():
+            await db.workout_logs.insert_one({"userId": "u1", "date": day(0)})
+            await record_workout_days(db, "u1", [day(0)])
+
+        racing = RacingDb(db, log_today)
+        await recompute_streak(racing, "u1")
+        return racing.reads, await streak(db, "u1")
+
+    reads, state = asyncio.run(scenario())
+    # The first read missed today's log; its stale result must not be written
+    assert reads == 2
+    assert state["currentStreak"] == 4 and state["lastActiveDate"] == day(0)
+
+
+class RacingDb:
+    """Runs `race` right after the first workout_logs read, as a concurrent request would."""
+
+    def __init__(self, db, race):
+        self.db = db
+        self.race = race
+        self.reads = 0
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    @property
+    def workout_logs(self):
+        return self
+
+    def aggregate(self, pipeline):
+        self.reads += 1
+        return self._read(pipeline, self.reads == 1)
+
+    async def _read(self, pipeline, race):
+        docs = await self.db.workout_logs.aggregate(pipeline).to_list(None)
+        if race:
+            await self.race()
+        for doc in docs:
+            yield doc
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+
+from weights import record_weights, weight_series
+
+
+def entries(rows):
+    return [{"id": str(i), "userId": "u1", "date": day, "weight": weight} for i, (day, weight) in enumerate(rows)]
+
+
+def test_series_orders_points_and_fits_trend(db):
+    async def scenario():
+        await record_weights(db, entries([("2026-01-15", 80.0), ("2026-01-01", 81.0), ("2026-02-01", 79.0)]))
+        return await weight_series(db, "u1", "2026-01-01", "2026-02-28", points=200)
+
+    series = asyncio.run(scenario())
+    assert series["dates"] == ["2026-01-01", "2026-01-15", "2026-02-01"]
+    assert list(series["weights"]) == [81.0, 80.0, 79.0]
+    assert series["trend"]["slopePerWeek"] < 0
+
+
+def test_malformed_stored_points_are_skipped_and_logged(db, caplog):
+    async def scenario():
+        await record_weights(db, entries([("2026-01-01", 80.0), ("2026-01-02", 79.5)]))
+        # Rows stored before input validation
+        await db.weight_buckets.update_one(
+            {"userId": "u1", "month": "2026-01"},
+            {"$push": {"points": {"$each": [
+                {"id": "x1", "date": "2026-01-32", "weight": 70},
+                {"id": "x2", "date": "2026-01-1", "weight": 70},
+                {"id": "x3", "date": None, "weight": 70},
+                {"id": "x4", "date": "2026-01-03", "weight": "heavy"},
+                {"id": "x5", "weight": 70},
+            ]}}},
+        )
+        return await weight_series(db, "u1", "2026-01-01", "2026-01-31", points=200)
+
+    with caplog.at_level(logging.WARNING, logger="weights"):
+        series = asyncio.run(scenario())
+    assert series["dates"] == ["2026-01-01", "2026-01-02"]
+    assert series["count"] == 2
+    assert "Skipped 5 malformed weight point(s) for u1" in caplog.text